@@ -1,172 +1,2540 @@
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
-import reportlab.lib.pagesizes as pagesizes
-from reportlab.pdfgen import canvas
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as ReportLabImage
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 import pathlib
-import easyocr
 import os
-import PIL
-from PIL import __version__ as PILLOW_VERSION
+import re
+import argparse
+import glob
+import fnmatch
+import sys
+import copy
+import gc
+import threading
+import hashlib
+import json
+import sqlite3
+import zlib
+import io
+import queue
+import time
+import functools
+import importlib.metadata
+import concurrent.futures
+import collections
+import itertools
+import html
+import multiprocessing
+import multiprocessing.util
 
-print(f"Pillow version: {PILLOW_VERSION}") # Print Pillow version for debugging
+# EasyOCR (which pulls in torch) and ReportLab are imported where they are first needed, and the PDF font
+# is registered on first use, so importing this module (e.g. for the GUI or the CLI --help) stays fast.
 
-# Register a font for better text rendering (optional, but recommended)
-try:
-    pdfmetrics.registerFont(TTFont('ArialUnicodeMS', 'arial-unicode-ms.ttf')) # You might need to provide the correct path to this font file or another unicode font
-    DEFAULT_FONT = 'ArialUnicodeMS'
-except Exception as e:
-    print(f"Warning: Font registration failed: {e}. Using default ReportLab font.")
-    DEFAULT_FONT = 'Helvetica' # Fallback font
+PDF_FONT_NAME = 'ArialUnicodeMS'
+PDF_FONT_FILE = 'arial-unicode-ms.ttf' # You might need to provide the correct path to this font file or another unicode font
+FALLBACK_PDF_FONT = 'Helvetica'
 
-def draw_bounds_before_process(img_path, output_dir):
+_pdf_font = None
+_pdf_font_lock = threading.Lock()
+
+OVERLAY_FONT_FILE = 'arial.ttf' # You might need to provide the correct path to arial.ttf or another font
+OVERLAY_FONT_SIZE = 16
+
+def get_pdf_font():
     """
-    Detects text in an image using EasyOCR, visualizes the text bounding boxes and recognized text on the image,
-    and saves the visualized image.
+    Registers the Unicode font with ReportLab on first use and returns its name,
+    or the name of the built-in fallback font if registration fails.
+    """
+    global _pdf_font
+    if _pdf_font is None:
+        with _pdf_font_lock:
+            if _pdf_font is None:
+                from reportlab.pdfbase import pdfmetrics
+                from reportlab.pdfbase.ttfonts import TTFont
+                try:
+                    pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, PDF_FONT_FILE))
+                    _pdf_font = PDF_FONT_NAME
+                except Exception as e:
+                    print(f"Warning: Font registration failed: {e}. Using default ReportLab font.", file=sys.stderr)
+                    _pdf_font = FALLBACK_PDF_FONT
+    return _pdf_font
 
-    Args:
-        img_path (str): Path to the input image file.
-        output_dir (str): Directory to save the output visualized image.
+@functools.lru_cache(maxsize=None)
+def get_overlay_font(path=OVERLAY_FONT_FILE, size=OVERLAY_FONT_SIZE):
+    """
+    Returns the PIL font for detection overlays, parsed once per (path, size) and shared by every thread,
+    or PIL's default font if the file cannot be loaded.
     """
-    # Initialize EasyOCR reader
-    reader = easyocr.Reader(['sv', 'en'], model_storage_directory=pathlib.Path('./model').resolve())
+    try:
+        return ImageFont.truetype(path, size=size)
+    except IOError:
+        return ImageFont.load_default()
 
-    # Load image
+@functools.lru_cache(maxsize=None)
+def easyocr_version():
+    """EasyOCR version from the package metadata, so that it can be checked without importing torch."""
     try:
-        # Try opening with exif=None (for Pillow >= 9.2.0)
-        image = Image.open(img_path, exif=None).convert('RGB')
-    except TypeError:
-        # Fallback for older Pillow versions: open without exif, then transpose based on EXIF
-        image = Image.open(img_path).convert('RGB')
+        return importlib.metadata.version('easyocr')
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+DEFAULT_LANGUAGES = ('sv', 'en')
+DEFAULT_MODEL_DIR = './model'
+
+def model_files(model_dir):
+    """
+    Identifies the EasyOCR model weights in use: the absolute model directory (EasyOCR's own default for None)
+    and the name, size and modification time of every file in it. Only stats the files, cheap enough per page.
+    """
+    if model_dir is None:
+        model_dir = os.path.join(os.environ.get('EASYOCR_MODULE_PATH', '~/.EasyOCR'), 'model')
+    model_dir = os.path.abspath(os.path.expanduser(model_dir))
+    try:
+        entries = sorted((entry.name, entry.stat().st_size, entry.stat().st_mtime) for entry in os.scandir(model_dir) if entry.is_file())
+    except OSError:
+        entries = [] # Not downloaded yet
+    return (model_dir, tuple(entries))
+
+# Process-wide pool of loaded EasyOCR readers, keyed by (languages, model dir, gpu).
+# Loading the detector and recognizer weights takes longer than OCR on a single page,
+# so each reader is created once and then shared by every worker thread.
+_reader_pool = {}
+_reader_locks = {} # One lock per key, so loading one model does not block users of another
+_reader_pool_lock = threading.Lock()
+
+def reader_key(languages=DEFAULT_LANGUAGES, model_dir=DEFAULT_MODEL_DIR, gpu=True):
+    """Returns the pool key for a reader configuration."""
+    return (tuple(languages), str(pathlib.Path(model_dir).resolve()), bool(gpu))
+
+def get_reader(languages=DEFAULT_LANGUAGES, model_dir=DEFAULT_MODEL_DIR, gpu=True):
+    """
+    Returns the shared EasyOCR reader for the given configuration, loading the models on first use.
+    Safe to call from several threads at once; the models are only ever loaded once per key.
+
+    Args:
+        languages (iterable of str): EasyOCR language codes.
+        model_dir (str): Directory holding the downloaded EasyOCR models.
+        gpu (bool): Whether EasyOCR may use the GPU.
+    """
+    key = reader_key(languages, model_dir, gpu)
+    reader = _reader_pool.get(key)
+    if reader is not None:
+        return reader
+
+    with _reader_pool_lock:
+        key_lock = _reader_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        reader = _reader_pool.get(key) # Another thread may have loaded it while we waited
+        if reader is None:
+            import easyocr # Deferred: importing EasyOCR loads torch, which takes seconds
+            languages, model_dir, gpu = key
+            # Not verbose: its download progress bar goes to stdout, which the JSON progress events (--progress) own
+            reader = easyocr.Reader(list(languages), model_storage_directory=model_dir, gpu=gpu, verbose=False)
+            _reader_pool[key] = reader
+    return reader
+
+def warm_up_readers(configs=None, background=False):
+    """
+    Loads readers ahead of time so the first processed image does not pay for model loading.
+
+    Args:
+        configs (list of dict): get_reader() keyword arguments, one dict per reader. Defaults to the default reader.
+        background (bool): Load in a daemon thread and return that thread instead of blocking.
+    """
+    configs = configs or [{}]
+
+    def load_all():
+        for config in configs:
+            try:
+                get_reader(**config)
+            except Exception as e:
+                print(f"Warning: Failed to warm up EasyOCR reader {config}: {e}", file=sys.stderr)
+
+    if background:
+        thread = threading.Thread(target=load_all, name="reader-warmup", daemon=True)
+        thread.start()
+        return thread
+    load_all()
+    return None
+
+def release_readers(key=None):
+    """
+    Drops pooled readers so their memory can be reclaimed. Workers that still hold a reference
+    keep it alive until they finish; the next get_reader() call loads the models again.
+
+    Args:
+        key (tuple): A key from reader_key(). Releases every reader when None.
+
+    Returns:
+        int: Number of readers released.
+    """
+    with _reader_pool_lock:
+        keys = list(_reader_pool) if key is None else [key]
+        released = 0
+        for k in keys:
+            if _reader_pool.pop(k, None) is not None:
+                released += 1
+            _reader_locks.pop(k, None)
+        for batched_key in [bk for bk in _batched_readers if key is None or bk[0] == key]:
+            _batched_readers.pop(batched_key).close()
+
+    gc.collect()
+    torch = sys.modules.get('torch') # Only touch torch if EasyOCR already imported it
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    return released
+
+class BatchedReader:
+    """
+    Wraps a reader so that readtext() calls made concurrently by several workers are run through
+    EasyOCR together. Requests are collected until `batch_size` pages are waiting or the oldest one
+    has waited `max_latency` seconds. Pages with the same dimensions and arguments go through a single
+    readtext_batched() call, so the detector sees them as one batch; recognition batches up to
+    `batch_size` text-line crops per step. Each caller gets back only its own page's results.
+
+    Exposes the same readtext() as an EasyOCR reader, so it can be used wherever one is expected.
+    """
+    def __init__(self, reader, batch_size=8, max_latency=0.05):
+        self.reader = reader
+        self.batch_size = max(1, int(batch_size))
+        self.max_latency = max_latency
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._dispatch, name="ocr-batcher", daemon=True)
+        self._thread.start()
+
+    def readtext(self, image, **kwargs):
+        """Queues the page for the next batch and blocks until its results are ready."""
+        request = _BatchRequest(image, kwargs)
+        self._requests.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.results
+
+    def __getattr__(self, name):
+        # detect(), recognize() etc. go straight to the wrapped reader, unbatched
+        return getattr(self.reader, name)
+
+    def close(self):
+        """Stops the dispatcher thread once the requests queued so far have been served."""
+        self._requests.put(None)
+
+    def _dispatch(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            batch = [request]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._run_batch(batch)
+                    return
+                batch.append(request)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        # Every request must end up with its results or an error and be released, whatever goes wrong here:
+        # an exception escaping into _dispatch() would stop the thread and leave all callers waiting forever
+        try:
+            # readtext_batched() stacks its inputs, so only pages of identical shape can share a call
+            groups = {}
+            for request in batch:
+                group_key = (request.image.shape, tuple(sorted(request.kwargs.items())))
+                groups.setdefault(group_key, []).append(request)
+
+            for requests in groups.values():
+                kwargs = dict(requests[0].kwargs)
+                kwargs.setdefault('batch_size', self.batch_size)
+                try:
+                    if len(requests) == 1:
+                        results = [self.reader.readtext(requests[0].image, **kwargs)]
+                    else:
+                        results = self.reader.readtext_batched([request.image for request in requests], **kwargs)
+                    if len(results) != len(requests):
+                        raise RuntimeError(f"readtext_batched() returned {len(results)} results for {len(requests)} pages")
+                    for request, page_results in zip(requests, results):
+                        request.results = page_results
+                except Exception as e:
+                    for request in requests:
+                        request.error = e
+                for request in requests:
+                    request.done.set()
+        except Exception as e: # E.g. an input without .shape or an unhashable argument
+            for request in batch:
+                if not request.done.is_set():
+                    request.error = e
+        finally:
+            for request in batch:
+                request.done.set()
+
+class _BatchRequest:
+    def __init__(self, image, kwargs):
+        self.image = image
+        self.kwargs = kwargs
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+_batched_readers = {}
+
+def get_batched_reader(languages=DEFAULT_LANGUAGES, model_dir=DEFAULT_MODEL_DIR, gpu=True, batch_size=8, max_latency=0.05):
+    """
+    Returns the shared BatchedReader around get_reader() for the given configuration.
+    Every worker must use the same instance for their pages to end up in the same batches.
+    """
+    key = (reader_key(languages, model_dir, gpu), batch_size, max_latency)
+    with _reader_pool_lock:
+        batched = _batched_readers.get(key)
+    if batched is None:
+        reader = get_reader(languages, model_dir, gpu) # Loads outside the pool lock
+        with _reader_pool_lock:
+            batched = _batched_readers.get(key)
+            if batched is None:
+                batched = _batched_readers[key] = BatchedReader(reader, batch_size, max_latency)
+    return batched
+
+DEFAULT_CACHE_PATH = './cache/ocr_cache.sqlite'
+OCR_CACHE_FORMAT = 1 # Bump when the stored result format changes, old entries are then ignored
+
+class OcrCache:
+    """
+    On-disk cache of OCR results, so re-running a batch does not OCR unchanged images again.
+
+    Entries are keyed by a SHA-256 of the image file bytes plus the OCR settings fingerprint
+    (languages, EasyOCR version, ...), so a changed image or different settings never hit a stale entry.
+    The (bbox, text, prob) results are stored as zlib-compressed compact JSON in a single SQLite file.
+    When the stored results exceed `max_bytes`, the least recently used entries are evicted.
+
+    Safe to share between threads; several processes may use the same file at once.
+
+    Args:
+        path (str): Path of the SQLite cache file. Its directory is created if needed.
+        max_bytes (int): Size cap for the stored results.
+    """
+    def __init__(self, path, max_bytes=512 * 1024 * 1024):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        pathlib.Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL") # Readers in other processes do not block writers
+        self._conn.execute("CREATE TABLE IF NOT EXISTS ocr_results (key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ocr_results_last_used ON ocr_results (last_used)")
+
+    @staticmethod
+    def key_for(img_path, fingerprint):
+        """Returns the cache key for an image file and an OCR settings fingerprint."""
+        return file_sha256(img_path, repr((OCR_CACHE_FORMAT, fingerprint)).encode('utf-8'))
+
+    def get(self, key):
+        """Returns the cached results for a key, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM ocr_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE ocr_results SET last_used = ? WHERE key = ?", (time.time(), key))
+        return [(bbox, text, prob) for bbox, text, prob in json.loads(zlib.decompress(row[0]))]
+
+    def put(self, key, results):
+        """Stores the results for a key, evicting old entries if the cache grows past its cap."""
+        compact = [[[[_compact_number(v) for v in point] for point in bbox], text, round(float(prob), 4)] for bbox, text, prob in results]
+        data = zlib.compress(json.dumps(compact, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO ocr_results (key, data, size, last_used) VALUES (?, ?, ?, ?)",
+                               (key, data, len(data), time.time()))
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9 # Evict a little extra so the next few puts do not evict again
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM ocr_results ORDER BY last_used"):
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM ocr_results WHERE key = ?", doomed)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM ocr_results")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def _compact_number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 2)
+
+_ocr_caches = {}
+
+def get_ocr_cache(path, max_bytes=512 * 1024 * 1024):
+    """Returns the process-wide OcrCache for a cache file, opening it on first use."""
+    key = str(pathlib.Path(path).resolve())
+    with _reader_pool_lock:
+        cache = _ocr_caches.get(key)
+        if cache is None:
+            cache = _ocr_caches[key] = OcrCache(key, max_bytes)
+    return cache
+
+
+MANIFEST_NAME = '.img2pdf-manifest.sqlite' # Kept in the batch's output directory
+
+class JobManifest:
+    """
+    On-disk record of a batch, so that a crashed or closed batch can be resumed without redoing finished files.
+
+    Every input file gets one row with its SHA-256, status ('pending', 'running', 'done' or 'error'),
+    output paths, processing time, stage timings and last error. Each change is committed immediately,
+    so the manifest is consistent whenever the process dies. Files can be added while a batch is running,
+    from any thread or process.
+
+    A file counts as finished when its row is 'done' with the same requested outputs and output settings
+    (see PipelineOptions.output_fingerprint()), all its outputs still exist and the file is unchanged:
+    the same size and modification time, or failing that the same hash (e.g. after a copy).
+
+    Args:
+        path (str): Path of the SQLite manifest file. Its directory is created if needed.
+    """
+    def __init__(self, path):
+        self.path = str(path)
+        pathlib.Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS jobs (path TEXT PRIMARY KEY, status TEXT NOT NULL, hash TEXT, size INTEGER, mtime REAL, "
+                           "outputs TEXT, seconds REAL, timings TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, updated REAL NOT NULL, "
+                           "requested TEXT, fingerprint TEXT)")
+        # Manifests written before the output settings were recorded get the columns added; their rows never match
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column in ('requested', 'fingerprint'):
+            if column not in columns:
+                try:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+                except sqlite3.OperationalError: # Another process added it first
+                    pass
+
+    @staticmethod
+    def _key(img_path):
+        return str(pathlib.Path(img_path).resolve())
+
+    def add(self, img_paths):
+        """Adds files to the batch as 'pending'. Files the manifest already knows keep their state."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO jobs (path, status, updated) VALUES (?, 'pending', ?)",
+                                   [(self._key(p), now) for p in img_paths])
+
+    def is_finished(self, img_path, options):
+        """
+        True when the file was converted before with the same outputs and settings as `options` asks for
+        (a PipelineOptions), and neither it nor its outputs changed since.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT status, hash, size, mtime, outputs, requested, fingerprint FROM jobs WHERE path = ?",
+                                     (self._key(img_path),)).fetchone()
+        if row is None or row[0] != 'done':
+            return False
+        status, digest, size, mtime, outputs, requested, fingerprint = row
+        if requested != json.dumps(sorted(options.outputs)) or fingerprint != options.output_fingerprint():
+            return False
+        if not all(os.path.exists(output) for output in json.loads(outputs).values()):
+            return False
+        try:
+            stat = os.stat(img_path)
+        except OSError:
+            return False
+        if (stat.st_size, stat.st_mtime) == (size, mtime):
+            return True
+        return file_sha256(img_path) == digest
+
+    def start(self, img_path):
+        """Marks a file as being processed. Files still 'running' after a crash count as unfinished."""
+        with self._lock:
+            self._conn.execute("INSERT INTO jobs (path, status, attempts, updated) VALUES (?, 'running', 1, ?) "
+                               "ON CONFLICT(path) DO UPDATE SET status = 'running', attempts = attempts + 1, updated = excluded.updated",
+                               (self._key(img_path), time.time()))
+
+    def finish(self, img_path, result, options):
+        """
+        Records a file as done, with the result dict of run_job() and the PipelineOptions it ran with.
+        The file's size, modification time and hash are taken from result['source'] as run_job() found them,
+        so that a file moved or deleted since is still recorded.
+        """
+        source = result['source']
+        outputs = {name: os.path.abspath(path) for name, path in result['outputs'].items()}
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = 'done', hash = ?, size = ?, mtime = ?, outputs = ?, seconds = ?, timings = ?, "
+                               "error = NULL, requested = ?, fingerprint = ?, updated = ? WHERE path = ?",
+                               (source['hash'], source['size'], source['mtime'], json.dumps(outputs), result.get('seconds'),
+                                json.dumps(result['timings']) if result.get('timings') else None,
+                                json.dumps(sorted(options.outputs)), options.output_fingerprint(), time.time(), self._key(img_path)))
+
+    def fail(self, img_path, error):
+        """Records a file as failed; it is retried by the next run."""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = 'error', error = ?, updated = ? WHERE path = ?",
+                               (str(error), time.time(), self._key(img_path)))
+
+    def unfinished(self):
+        """Paths of the files that are not done yet (pending, interrupted or failed), in the order they were added."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT path FROM jobs WHERE status != 'done' ORDER BY rowid")]
+
+    def counts(self):
+        """Number of files per status."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def file_sha256(img_path, prefix=b''):
+    """Hex SHA-256 of prefix followed by the contents of a file, read in chunks."""
+    digest = hashlib.sha256(prefix)
+    with open(img_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PipelineOptions:
+    """
+    Settings shared by every stage of the conversion pipeline. Kept as a plain object so it can be
+    handed to worker threads (and pickled for worker processes) as a single argument.
+
+    Args:
+        outputs (iterable of str): Names from OUTPUT_WRITERS to produce for each image, e.g. ('pdf', 'overlay').
+        languages (iterable of str): EasyOCR language codes.
+        model_dir (str): Directory holding the downloaded EasyOCR models.
+        gpu (bool): Whether EasyOCR may use the GPU.
+        batch_size (int): Pages per inference batch across concurrent workers. 1 disables batching.
+        batch_latency (float): Longest time in seconds a page waits for a batch to fill up.
+        jpeg_passthrough (bool): Embed unrotated JPEG sources in the PDF without re-encoding them.
+        cache_path (str): SQLite file for the OCR result cache (see OcrCache). None disables caching.
+        cache_max_bytes (int): Size cap of the OCR result cache.
+        detection (str): 'full', 'downscale', 'tile' or 'auto', see run_ocr().
+        detect_max_side (int): Longest side of the image that detection sees in 'downscale' mode.
+        tile_size (int): Side of the square detection tiles in 'tile' mode; bounds detection memory per call.
+        tile_overlap (int): Overlap between neighbouring tiles, should exceed the tallest expected text line.
+        max_detect_pixels (int): Largest image (width * height) that 'auto' mode detects on at full resolution.
+        memory_map (bool): Memory-map uncompressed TIFF/PPM inputs instead of decoding them into a copy.
+        prefetch (int): Images decoded ahead of OCR by multi-page documents and thread-mode batches.
+        instrument (bool): Record per-stage timings, box counts and image size on each page (see stage()).
+        profile_dir (str): Save a cProfile capture of each batch job whose file name matches profile_pattern here.
+            In thread mode profiled jobs run one at a time.
+        profile_pattern (str): fnmatch pattern selecting the files to profile.
+        compression (str): Name from COMPRESSION_PROFILES for the embedded page image, or None to embed it as decoded.
+        export_path (str): Path prefix of rolling files that the 'hocr', 'alto' and 'jsonl' outputs stream into
+            (see ExportSink). None writes one file per image instead.
+        export_max_bytes (int): Size at which a rolling export file is closed and the next one started.
+        adaptive (bool): Run a cheap first OCR pass, then re-recognize only its low-confidence boxes at full quality.
+        adaptive_threshold (float): Confidence below which a box of the first pass is re-recognized.
+        adaptive_canvas_size (int): Longest side detection works at in the first pass ('full' detection only), None for EasyOCR's default.
+        adaptive_beam_width (int): Beam width of the beam search decoder used for re-recognition.
+        blank_policy (str): What to do with blank pages, from BLANK_POLICIES (see screen_page()). None disables the check.
+        blank_ink (float): Ink coverage (fraction of the page) below which a page counts as blank.
+        duplicate_policy (str): What to do with near-duplicates of earlier pages, from DUPLICATE_POLICIES. None disables the check.
+        duplicate_distance (int): Largest number of differing dHash bits (of 256) for a near-duplicate candidate.
+            A hash match is always confirmed on a page thumbnail (see same_page()).
+        verbose (bool): Report each file written on stderr.
+    """
+    def __init__(self, outputs=('pdf',), languages=DEFAULT_LANGUAGES, model_dir=DEFAULT_MODEL_DIR, gpu=True,
+                 batch_size=1, batch_latency=0.05, jpeg_passthrough=True,
+                 cache_path=None, cache_max_bytes=512 * 1024 * 1024,
+                 detection='full', detect_max_side=2560, tile_size=2048, tile_overlap=128, max_detect_pixels=16_000_000,
+                 memory_map=True, prefetch=2, instrument=False, profile_dir=None, profile_pattern='*',
+                 compression=None, export_path=None, export_max_bytes=256 * 1024 * 1024,
+                 adaptive=False, adaptive_threshold=0.5, adaptive_canvas_size=1280, adaptive_beam_width=5,
+                 blank_policy=None, blank_ink=0.0001, duplicate_policy=None, duplicate_distance=32,
+                 verbose=False):
+        self.outputs = tuple(outputs)
+        self.languages = tuple(languages)
+        self.model_dir = model_dir
+        self.gpu = gpu
+        self.batch_size = batch_size
+        self.batch_latency = batch_latency
+        self.jpeg_passthrough = jpeg_passthrough
+        self.cache_path = cache_path
+        self.cache_max_bytes = cache_max_bytes
+        self.detection = detection
+        self.detect_max_side = detect_max_side
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.max_detect_pixels = max_detect_pixels
+        self.memory_map = memory_map
+        self.prefetch = prefetch
+        self.instrument = instrument
+        self.profile_dir = profile_dir
+        self.profile_pattern = profile_pattern
+        self.compression = compression
+        self.export_path = export_path
+        self.export_max_bytes = export_max_bytes
+        self.adaptive = adaptive
+        self.adaptive_threshold = adaptive_threshold
+        self.adaptive_canvas_size = adaptive_canvas_size
+        self.adaptive_beam_width = adaptive_beam_width
+        self.blank_policy = blank_policy
+        self.blank_ink = blank_ink
+        self.duplicate_policy = duplicate_policy
+        self.duplicate_distance = duplicate_distance
+        self.verbose = verbose
+
+    def replace(self, **changes):
+        """Returns a copy of the options with the given attributes changed."""
+        options = copy.copy(self)
+        for name, value in changes.items():
+            setattr(options, name, value)
+        return options
+
+    def ocr_fingerprint(self):
+        """Everything besides the image itself that affects the OCR results, used in OCR cache keys."""
+        fingerprint = (self.languages, easyocr_version(), model_files(self.model_dir))
+        if self.detection != 'full':
+            fingerprint += (self.detection, self.detect_max_side, self.tile_size, self.tile_overlap, self.max_detect_pixels)
+        if self.adaptive:
+            fingerprint += ('adaptive', self.adaptive_threshold, self.adaptive_canvas_size, self.adaptive_beam_width)
+        return fingerprint
+
+    def output_fingerprint(self):
+        """Hex digest of everything that decides which outputs are written and what they contain, see JobManifest."""
+        fingerprint = (sorted(self.outputs), self.ocr_fingerprint(), self.jpeg_passthrough, self.compression, self.export_path,
+                       self.blank_policy, self.blank_ink, self.duplicate_policy, self.duplicate_distance)
+        return hashlib.sha256(repr(fingerprint).encode('utf-8')).hexdigest()
+
+    def get_cache(self):
+        if self.cache_path is None:
+            return None
+        return get_ocr_cache(self.cache_path, self.cache_max_bytes)
+
+    def get_reader(self):
+        if self.batch_size > 1:
+            return get_batched_reader(self.languages, self.model_dir, self.gpu, self.batch_size, self.batch_latency)
+        return get_reader(self.languages, self.model_dir, self.gpu)
+
+
+# Stage timing. Stages are only timed for pages decoded with PipelineOptions.instrument set (the events are
+# kept on page.timings, whichever thread or process ran the stage) or while a global listener is registered.
+# Otherwise stage() hands out a shared no-op context manager, so the instrumentation costs next to nothing.
+_timing_listeners = []
+
+def add_timing_listener(listener):
+    """Registers a callable that receives every stage event dict, from whichever thread ran the stage."""
+    _timing_listeners.append(listener)
+
+def remove_timing_listener(listener):
+    _timing_listeners.remove(listener)
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+    def set(self, **fields):
+        pass
+
+_NULL_STAGE = _NullStage()
+
+class _Stage:
+    def __init__(self, name, page, fields):
+        self.name = name
+        self.page = page
+        self.fields = fields
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        _emit_stage(self.name, self.page, time.perf_counter() - self.started, self.fields)
+        return False
+
+    def set(self, **fields):
+        """Adds fields to the event, e.g. a box count that is only known once the stage has run."""
+        self.fields.update(fields)
+
+def stage(name, page=None, **fields):
+    """
+    Context manager timing one pipeline stage for a page, e.g. `with stage('readtext', page) as s: ...`.
+    Extra fields (and s.set(...)) are included in the event.
+    """
+    if not _timing_listeners and (page is None or page.timings is None):
+        return _NULL_STAGE
+    return _Stage(name, page, fields)
+
+def _emit_stage(name, page, seconds, fields):
+    event = {'stage': name, 'file': page.path if page is not None else None, 'seconds': seconds, **fields}
+    if page is not None and page.timings is not None:
+        page.timings.append(event)
+    for listener in list(_timing_listeners):
+        listener(event)
+
+def summarize_timings(events):
+    """Condenses a page's stage events into {'stages': {name: seconds}, ...fields such as boxes, width, height}."""
+    summary = {'stages': {}}
+    for event in events:
+        summary['stages'][event['stage']] = round(summary['stages'].get(event['stage'], 0) + event['seconds'], 4)
+        summary.update({k: v for k, v in event.items() if k not in ('stage', 'file', 'seconds')})
+    return summary
+
+class OcrPage:
+    """
+    A decoded image together with its OCR results, shared by all output writers.
+
+    The pixels are available both as a PIL image and as a NumPy array. Whichever one the page was decoded
+    into is converted to the other at most once, on first use, and every stage then shares that buffer.
+
+    Args:
+        path (str): Path of the source image file.
+        image (PIL.Image.Image): The decoded image with EXIF orientation applied.
+        results (list): EasyOCR (bbox, text, prob) tuples, or None before OCR.
+        source_format (str): PIL format of the source file, e.g. 'JPEG'.
+        transformed (bool): Whether the decoded pixels differ from the source file (rotated or converted).
+        pixels (numpy.ndarray): The decoded pixels, e.g. a read-only memory map, when there is no PIL image.
+    """
+    def __init__(self, path, image=None, results=None, source_format=None, transformed=False, pixels=None):
+        self.path = path
+        self._image = image
+        self._pixels = pixels
+        self.results = results
+        self.source_format = source_format
+        self.transformed = transformed
+        self.timings = None # List of stage events when instrumented, see stage()
+        self.encoded = None # Future of the compressed page image, see start_page_encoding()
+        self._layout = None
+        self.hash_entry = None # PageHashEntry of the page, when duplicate screening is on
+        self.screen = None # Why screening flagged the page, see screen_page()
+
+    @property
+    def image(self):
+        if self._image is None:
+            height, width = self._pixels.shape[:2]
+            if self._pixels.ndim == 2:
+                # Greyscale buffers are wrapped, not copied
+                self._image = Image.frombuffer('L', (width, height), self._pixels, 'raw', 'L', 0, 1)
+            else:
+                self._image = Image.fromarray(self._pixels, 'RGB')
+        return self._image
+
+    @property
+    def pixels(self):
+        """The pixels as a NumPy array, shared read-only by every stage that needs one."""
+        if self._pixels is None:
+            self._pixels = np.asarray(self._image)
+        return self._pixels
+
+    @property
+    def size(self):
+        if self._image is not None:
+            return self._image.size
+        height, width = self._pixels.shape[:2]
+        return width, height
+
+    @property
+    def layout(self):
+        """
+        (extents, order) of the results: the box extents array and the reading order, see box_extents() and
+        reading_order(). Worked out once and shared by the PDF text layer and the exports.
+        """
+        if self._layout is None or self._layout[0] is not self.results:
+            extents = box_extents(self.results)
+            self._layout = (self.results, extents, reading_order(self.results, extents))
+        return self._layout[1:]
+
+    @property
+    def can_passthrough(self):
+        """True when the source file is a JPEG that can be embedded in a PDF as is, without re-encoding."""
+        return self.source_format == 'JPEG' and not self.transformed
+
+    def release(self):
+        """Drops the decoded pixels (closing any memory map) once all outputs are written."""
+        if self.encoded is not None:
+            if not self.encoded.cancel():
+                concurrent.futures.wait([self.encoded]) # Never close the image under a running encoder
+            self.encoded = None
+        if self._image is not None:
+            self._image.close()
+        self._image = None
+        self._pixels = None
+
+
+def load_image(img_path):
+    """
+    Opens and decodes an image and applies its EXIF orientation.
+
+    Returns:
+        tuple: (image, source_format, transformed) where image is in RGB or L mode, source_format is the
+        PIL format of the file and transformed tells whether the pixels had to be rotated or converted.
+    """
+    image = Image.open(img_path)
+    source_format = image.format
+    transformed = False
+    # Decode now: Image.open() only parses the header, and the pixels would otherwise be decoded by whichever
+    # stage touches them first (OCR, on the worker instead of the prefetch thread)
+    image.load()
+
+    orientation = image.getexif().get(0x0112, 1) # EXIF Orientation tag
+    if orientation not in (None, 1): # Only transpose when needed, exif_transpose() otherwise returns a full copy
         try:
             import PIL.ImageOps
-            image = PIL.ImageOps.exif_transpose(image) # Apply EXIF orientation if present
+            image = PIL.ImageOps.exif_transpose(image) # Apply EXIF orientation
+            transformed = True
         except AttributeError:
-            print("Warning: PIL.ImageOps.exif_transpose not available. Image rotation might not be corrected.")
+            print("Warning: PIL.ImageOps.exif_transpose not available. Image rotation might not be corrected.", file=sys.stderr)
+
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+        transformed = True
+    return image, source_format, transformed
 
+def map_image(img_path):
+    """
+    Memory-maps an uncompressed image (plain TIFF, PPM/PGM) as a read-only NumPy array, so the pixels are
+    paged in from the file as they are read instead of being decoded into a copy.
 
-    image_np = np.array(image)
+    Returns:
+        tuple: (pixels, source_format), or None if the file is compressed, rotated or not 8-bit RGB/L
+        top-down data stored in one contiguous block, in which case it has to be decoded with load_image().
+    """
+    with Image.open(img_path) as image:
+        if image.mode not in ('RGB', 'L') or not image.tile:
+            return None
+        if image.getexif().get(0x0112, 1) not in (None, 1):
+            return None
+        width, height = image.size
+        channels = 3 if image.mode == 'RGB' else 1
+        row_bytes = width * channels
 
-    # Detect text
-    results = reader.readtext(image_np)
+        expected_offset = image.tile[0].offset if hasattr(image.tile[0], 'offset') else image.tile[0][2]
+        for tile in image.tile:
+            codec, extents, offset, args = tile
+            rawmode, stride, ystep = (args, 0, 1) if isinstance(args, str) else (tuple(args) + (0, 1))[:3]
+            x0, y0, x1, y1 = extents
+            if (codec != 'raw' or rawmode != image.mode or stride not in (0, row_bytes) or ystep != 1
+                    or x0 != 0 or x1 != width or offset != expected_offset):
+                return None
+            expected_offset += (y1 - y0) * row_bytes # Strips must follow each other without gaps
+        if expected_offset - image.tile[0][2] != height * row_bytes:
+            return None
 
-    # Create drawing object
-    draw = ImageDraw.Draw(image)
+        source_format = image.format
+        offset = image.tile[0][2]
 
-    for (bbox, text, prob) in results:
-        # Draw bounding box
-        top_left = tuple(map(int, bbox[0]))
-        top_right = tuple(map(int, bbox[1]))
-        bottom_right = tuple(map(int, bbox[2]))
-        bottom_left = tuple(map(int, bbox[3]))
-        draw.line([top_left, top_right, bottom_right, bottom_left, top_left], width=2, fill='red')
+    shape = (height, width, 3) if channels == 3 else (height, width)
+    return np.memmap(img_path, dtype=np.uint8, mode='r', offset=offset, shape=shape), source_format
 
-        # Draw text - simple text on top-left corner of bbox for visualization
+def decode_page(img_path, options=None):
+    """
+    Ingestion stage: turns an image file into an OcrPage without OCR results. Uncompressed files are
+    memory-mapped (see map_image() and PipelineOptions.memory_map), everything else is decoded by PIL.
+    """
+    options = options or PipelineOptions()
+    started = time.perf_counter()
+    page = None
+    if options.memory_map:
         try:
-            font = ImageFont.truetype("arial.ttf", size=16) # You might need to provide the correct path to arial.ttf or another font
-        except IOError:
-            font = ImageFont.load_default()
+            mapped = map_image(img_path)
+        except Exception:
+            mapped = None # Anything unusual about the file, let PIL decode it normally
+        if mapped is not None:
+            pixels, source_format = mapped
+            page = OcrPage(img_path, pixels=pixels, source_format=source_format)
+
+    if page is None:
+        image, source_format, transformed = load_image(img_path)
+        page = OcrPage(img_path, image, source_format=source_format, transformed=transformed)
+
+    if options.instrument:
+        page.timings = []
+    if _timing_listeners or page.timings is not None:
+        width, height = page.size
+        _emit_stage('decode', page, time.perf_counter() - started,
+                    {'width': width, 'height': height, 'memory_mapped': page._image is None})
+    return page
+
+class ImagePrefetcher:
+    """
+    Decodes images on background threads ahead of the OCR workers, so OCR never waits for decoding.
+    PIL releases the GIL while decoding, so this overlaps with OCR even in thread mode.
+    """
+    def __init__(self, options=None, threads=2):
+        self.options = options
+        self._executor = concurrent.futures.ThreadPoolExecutor(max(1, threads), thread_name_prefix="img2pdf-decode")
+
+    def submit(self, img_path, options=None):
+        """Starts decoding an image. Returns a Future of its OcrPage."""
+        return self._executor.submit(decode_page, img_path, options or self.options)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+def prefetch_pages(img_paths, options=None, depth=2):
+    """
+    Yields (img_path, OcrPage) in order while the next `depth` images are being decoded in the background.
+    A decoding error is raised when its image is reached.
+    """
+    prefetcher = ImagePrefetcher(options, threads=min(depth, 2))
+    try:
+        window = collections.deque()
+        img_paths = iter(img_paths)
+        for img_path in itertools.islice(img_paths, depth + 1):
+            window.append((img_path, prefetcher.submit(img_path)))
+        while window:
+            img_path, future = window.popleft()
+            page = future.result()
+            for next_path in itertools.islice(img_paths, 1):
+                window.append((next_path, prefetcher.submit(next_path)))
+            yield img_path, page
+    finally:
+        prefetcher.shutdown(wait=False)
+
+DETECTION_MODES = ('full', 'downscale', 'tile', 'auto')
+
+def run_ocr(page, reader, options):
+    """
+    Runs text detection and recognition on a decoded page according to options.detection:
+
+    - 'full': readtext() on the full-resolution image.
+    - 'downscale': detection on a copy whose longest side is at most options.detect_max_side,
+      recognition on the full-resolution crops.
+    - 'tile': detection on overlapping options.tile_size tiles (views into the image, not copies),
+      with duplicate boxes at the tile seams merged, then recognition on the full-resolution crops.
+    - 'auto': 'full' for images up to options.max_detect_pixels, 'tile' for larger ones.
 
-        draw.text(top_left, text, fill='blue', font=font)
+    With options.adaptive set, 'full' detection runs at options.adaptive_canvas_size instead, as the cheap first
+    pass of adaptive OCR (see refine_low_confidence()). Recognition always uses greedy decoding here.
+    Box coordinates are always in full-resolution pixels.
+
+    Returns:
+        list: EasyOCR (bbox, text, prob) tuples.
+    """
+    mode = options.detection
+    if mode not in DETECTION_MODES:
+        raise ValueError(f"Unknown detection mode: {mode}")
+    width, height = page.size
+    if mode == 'auto':
+        mode = 'full' if width * height <= options.max_detect_pixels else 'tile'
+
+    if mode == 'full':
+        if options.adaptive and options.adaptive_canvas_size:
+            return reader.readtext(page.pixels, canvas_size=options.adaptive_canvas_size)
+        return reader.readtext(page.pixels)
+
+    if mode == 'downscale':
+        horizontal_list, free_list = _detect_downscaled(page.image, reader, options.detect_max_side)
+    else:
+        horizontal_list, free_list = _detect_tiled(page.pixels, reader, options.tile_size, options.tile_overlap)
+
+    return reader.recognize(page_grey(page), horizontal_list=horizontal_list, free_list=free_list)
+
+def page_grey(page):
+    """The page as a greyscale array, which is what EasyOCR recognizes crops from."""
+    return page.pixels if page.pixels.ndim == 2 else np.asarray(page.image.convert('L'))
+
+def refine_low_confidence(page, reader, results, options):
+    """
+    Second pass of adaptive OCR: re-recognizes only the boxes whose confidence is below
+    options.adaptive_threshold, on full-resolution crops with beam search decoding, and keeps whichever
+    reading of each box is more confident. Boxes are never moved, added or dropped.
+
+    Returns:
+        list: The results, with the refined boxes' text and confidence replaced.
+    """
+    low = [i for i, (bbox, text, prob) in enumerate(results) if prob < options.adaptive_threshold]
+    if not low:
+        return results
+
+    # Axis-aligned boxes are cropped directly, rotated ones are warped from their four corners
+    corners = box_corners([results[i] for i in low])
+    aligned = ((corners[:, 0, 1] == corners[:, 1, 1]) & (corners[:, 2, 1] == corners[:, 3, 1]) &
+               (corners[:, 0, 0] == corners[:, 3, 0]) & (corners[:, 1, 0] == corners[:, 2, 0]))
+    horizontal_list = [[int(x_min), int(x_max), int(y_min), int(y_max)]
+                       for x_min, y_min, x_max, y_max in box_extents([results[i] for i in low])[aligned]]
+    free_list = corners[~aligned].tolist()
+    targets = [i for i, a in zip(low, aligned) if a] + [i for i, a in zip(low, aligned) if not a] # recognize() order
+
+    refined = reader.recognize(page_grey(page), horizontal_list=horizontal_list, free_list=free_list,
+                               decoder='beamsearch', beamWidth=options.adaptive_beam_width)
+    if len(refined) != len(targets):
+        print(f"Warning: Refinement of {page.path} returned {len(refined)} results for {len(targets)} boxes, keeping the first pass.", file=sys.stderr)
+        return results
+
+    results = list(results)
+    for i, (bbox, text, prob) in zip(targets, refined):
+        if prob > results[i][2]:
+            results[i] = (results[i][0], text, prob)
+    return results
+
+def _detect_downscaled(image, reader, max_side):
+    width, height = image.size
+    scale = min(1.0, max_side / max(width, height))
+    if scale < 1.0:
+        small = image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.BILINEAR)
+    else:
+        small = image
+    horizontal_list, free_list = reader.detect(np.asarray(small))
+    horizontal_list, free_list = horizontal_list[0], free_list[0]
+
+    # Map the boxes back to full resolution
+    horizontal_list = [[int(round(v / scale)) for v in box] for box in horizontal_list]
+    free_list = [[[v / scale for v in point] for point in box] for box in free_list]
+    return horizontal_list, free_list
+
+def _tile_starts(length, tile_size, overlap):
+    if length <= tile_size:
+        return [0]
+    step = max(1, tile_size - overlap)
+    starts = list(range(0, length - tile_size, step))
+    starts.append(length - tile_size) # Last tile is flush with the edge
+    return starts
+
+def _detect_tiled(pixels, reader, tile_size, overlap):
+    height, width = pixels.shape[:2]
+    boxes = [] # [x_min, x_max, y_min, y_max] in full-resolution coordinates
+    tile_ids = []
+    free_list = []
+    free_rects = []
+    for tile_id, (y0, x0) in enumerate((y0, x0) for y0 in _tile_starts(height, tile_size, overlap)
+                                                 for x0 in _tile_starts(width, tile_size, overlap)):
+        tile = pixels[y0:y0 + tile_size, x0:x0 + tile_size] # A view, no pixel copy
+        # canvas_size keeps EasyOCR from scaling the tile down again before detection
+        horizontal, free = reader.detect(tile, canvas_size=max(tile.shape[:2]))
+        for x_min, x_max, y_min, y_max in horizontal[0]:
+            boxes.append([x_min + x0, x_max + x0, y_min + y0, y_max + y0])
+            tile_ids.append(tile_id)
+        for box in free[0]:
+            points = [[x + x0, y + y0] for x, y in box]
+            xs = [p[0] for p in points]
+            ys = [p[1] for p in points]
+            rect = [min(xs), max(xs), min(ys), max(ys)]
+            # Rotated boxes are only deduplicated, a box seen whole in two overlapping tiles is kept once
+            if not any(_overlap_ratio(rect, other) > 0.5 for other in free_rects):
+                free_list.append(points)
+                free_rects.append(rect)
+    return _merge_seam_boxes(boxes, tile_ids), free_list
+
+def _overlap_ratio(a, b):
+    """Intersection area of two [x_min, x_max, y_min, y_max] boxes relative to the smaller one."""
+    ix = min(a[1], b[1]) - max(a[0], b[0])
+    iy = min(a[3], b[3]) - max(a[2], b[2])
+    if ix <= 0 or iy <= 0:
+        return 0.0
+    smaller = min((a[1] - a[0]) * (a[3] - a[2]), (b[1] - b[0]) * (b[3] - b[2]))
+    return ix * iy / smaller if smaller > 0 else 0.0
+
+def _merge_seam_boxes(boxes, tile_ids):
+    """
+    Merges boxes from different tiles that overlap on the same text line: the same word seen twice in
+    the overlap, or the two halves of a line cut by a seam. Boxes from the same tile are left alone.
+    """
+    if not boxes:
+        return []
+    b = np.asarray(boxes, dtype=np.float64)
+    tiles = np.asarray(tile_ids)
+    n = len(b)
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    heights = b[:, 3] - b[:, 2]
+    for i in range(n - 1):
+        others = slice(i + 1, n)
+        ix = np.minimum(b[i, 1], b[others, 1]) - np.maximum(b[i, 0], b[others, 0])
+        iy = np.minimum(b[i, 3], b[others, 3]) - np.maximum(b[i, 2], b[others, 2])
+        same_line = iy > 0.5 * np.minimum(heights[i], heights[others])
+        candidates = np.nonzero((tiles[others] != tiles[i]) & (ix >= 0) & same_line)[0] + i + 1
+        for j in candidates:
+            parent[find(j)] = find(i)
+
+    groups = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+    merged = []
+    for members in groups.values():
+        group = b[members]
+        merged.append([int(group[:, 0].min()), int(group[:, 1].max()), int(group[:, 2].min()), int(group[:, 3].max())])
+    return merged
+
+# Pre-OCR screening (PipelineOptions.blank_policy / duplicate_policy). Policies for a flagged page:
+#   'drop': leave the page out, no outputs are written for it.
+#   'image': skip OCR, the page is written without a text layer.
+#   'reuse': (duplicates only) take the OCR results of the earlier page it duplicates.
+BLANK_POLICIES = ('drop', 'image')
+DUPLICATE_POLICIES = ('drop', 'image', 'reuse')
+
+def ink_coverage(image, margin=0.05, contrast=64):
+    """
+    Fraction of the page covered by ink: pixels at least `contrast` grey levels darker than the paper
+    (the 90th percentile brightness, so that even densely printed pages measure against the paper). Measured on a sample of the page, leaving out a `margin` on each side where
+    scanner borders and shadows are.
+    """
+    sample = _sample(image, max_side=1024)
+    if sample.ndim == 3:
+        sample = sample.mean(axis=2)
+    height, width = sample.shape
+    dy, dx = int(height * margin), int(width * margin)
+    sample = sample[dy:height - dy, dx:width - dx]
+    if sample.size == 0:
+        return 0.0
+    paper = np.percentile(sample, 90)
+    return float(np.count_nonzero(sample < paper - contrast)) / sample.size
+
+def dhash(image, size=16):
+    """Difference hash of an image as size*size bits (32 bytes by default): near-identical scans differ in only a few bits."""
+    small = np.asarray(image.resize((size + 1, size), Image.BOX).convert('L'), dtype=np.int16)
+    return np.packbits(small[:, 1:] > small[:, :-1])
+
+def thumbnail(image, size=128):
+    """Greyscale size x size thumbnail of a page, for confirming a hash match pixel by pixel (see same_page())."""
+    return np.asarray(image.convert('L').resize((size, size), Image.BOX), dtype=np.uint8)
+
+# Thresholds of same_page(): a shared hash is only trusted if the thumbnails agree on average and
+# nearly everywhere, since a few filled-in fields or one line of text barely move the average
+DUPLICATE_MAX_MEAN_DIFFERENCE = 2.0 # Grey levels
+DUPLICATE_MAX_CHANGED = 0.002 # Fraction of thumbnail pixels differing by more than DUPLICATE_CHANGED_LEVELS
+DUPLICATE_CHANGED_LEVELS = 24
+
+def same_page(a, b):
+    """True if two thumbnails (see thumbnail()) show the same page, allowing for a uniform difference in exposure."""
+    difference = a.astype(np.int16) - b.astype(np.int16)
+    difference = np.abs(difference - int(np.median(difference)))
+    return (float(difference.mean()) <= DUPLICATE_MAX_MEAN_DIFFERENCE
+            and np.count_nonzero(difference > DUPLICATE_CHANGED_LEVELS) <= DUPLICATE_MAX_CHANGED * difference.size)
+
+class PageHashEntry:
+    """A page registered in a PageHashIndex. `results` is a future of its OCR results, set once the page is done."""
+    def __init__(self, path, thumb):
+        self.path = path
+        self.thumb = thumb
+        self.results = concurrent.futures.Future()
+
+class PageHashIndex:
+    """
+    Perceptual hashes of the pages screened so far, for finding near-duplicates by Hamming distance
+    in one vectorized pass; a hash match is then confirmed on the page thumbnails. Pages are registered
+    as soon as they are screened, before their OCR finishes, so that a duplicate screened concurrently is
+    still found and can wait for the results (see PageHashEntry). Thread-safe.
+    Each process has its own index, so with worker processes only duplicates seen by the same worker are found.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hashes = np.empty((64, 32), dtype=np.uint8) # Grown by doubling
+        self._entries = []
+
+    def claim(self, path, page_hash, thumb, max_distance):
+        """
+        Looks up the closest earlier page within max_distance bits whose thumbnail matches, and if there is none
+        registers this page, in one step so that two copies of a page screened at the same time cannot both miss.
+
+        Returns:
+            tuple: (entry, distance) of the earlier page, or (entry, None) with the new entry of this page.
+        """
+        with self._lock:
+            count = len(self._entries)
+            if count:
+                distances = np.unpackbits(self._hashes[:count] ^ page_hash, axis=1).sum(axis=1)
+                for i in np.argsort(distances, kind='stable'):
+                    if distances[i] > max_distance:
+                        break
+                    entry = self._entries[i]
+                    # A re-run of the same file is not a duplicate of itself
+                    if entry.path != path and same_page(entry.thumb, thumb):
+                        return entry, int(distances[i])
+            if count == len(self._hashes):
+                self._hashes = np.concatenate([self._hashes, np.empty_like(self._hashes)])
+            self._hashes[count] = page_hash
+            entry = PageHashEntry(path, thumb)
+            self._entries.append(entry)
+            return entry, None
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+
+page_hashes = PageHashIndex()
+
+def screen_page(page, options):
+    """
+    Cheap checks that run before OCR: blank pages by ink coverage (below options.blank_ink) and
+    duplicates of earlier pages by dHash (at most options.duplicate_distance bits apart) confirmed on a thumbnail.
+    For a flagged page, page.screen is set to a dict describing why, e.g. {'reason': 'blank', 'policy':
+    'image', 'ink': 0.00001}. Under the 'image' and 'reuse' policies page.results is filled in, so
+    that OCR is skipped. A page that is not a duplicate is registered in page_hashes, and page.hash_entry is set
+    to its entry, whose results screen_and_ocr() fills in.
+
+    Returns:
+        dict: page.screen, or None when the page is to be OCR'd as usual.
+    """
+    if options.blank_policy is None and options.duplicate_policy is None:
+        return None
+    with stage('screen', page) as timing:
+        if options.blank_policy is not None:
+            coverage = ink_coverage(page.image)
+            if coverage < options.blank_ink:
+                page.screen = {'reason': 'blank', 'policy': options.blank_policy, 'ink': round(coverage, 6)}
+        if page.screen is None and options.duplicate_policy is not None:
+            entry, distance = page_hashes.claim(page.path, dhash(page.image), thumbnail(page.image), options.duplicate_distance)
+            if distance is None:
+                page.hash_entry = entry
+            else:
+                page.screen = {'reason': 'duplicate', 'policy': options.duplicate_policy, 'of': entry.path, 'distance': distance}
+        if page.screen is not None and page.screen['policy'] == 'image':
+            page.results = []
+        timing.set(flagged=page.screen['reason'] if page.screen else None)
+    if page.screen is not None and page.screen['policy'] == 'reuse':
+        # The earlier page may still be in OCR on another thread
+        with stage('screen_wait', page):
+            try:
+                results = entry.results.result()
+            except Exception: # Its OCR failed, so this page gets its own
+                results = None
+        if results is None:
+            page.screen = None
+        else:
+            page.results = list(results)
+    return page.screen
+
+def screen_and_ocr(page, options=None, reader=None):
+    """
+    Screens a page (see screen_page()) and OCRs it unless screening already settled its results.
+
+    Returns:
+        bool: False if the page is to be dropped.
+    """
+    options = options or PipelineOptions()
+    screen = screen_page(page, options)
+    if screen is not None and screen['policy'] == 'drop':
+        print(f"Dropping {screen['reason']} page: {page.path}", file=sys.stderr)
+        return False
+    start_page_encoding(page, options)
+    if page.results is None:
+        try:
+            ocr_page(page, options, reader)
+        except BaseException as e:
+            if page.hash_entry is not None:
+                page.hash_entry.results.set_exception(e)
+            raise
+        if page.hash_entry is not None:
+            page.hash_entry.results.set_result(page.results if options.duplicate_policy == 'reuse' else None)
+    return True
+
+def ocr_page(page, options=None, reader=None):
+    """
+    Runs text detection and recognition on a decoded page once and stores the results on it,
+    or takes them from the OCR cache if options.cache_path is set and the image was seen before.
+
+    Returns:
+        OcrPage: The same page, with its (bbox, text, prob) results filled in.
+    """
+    options = options or PipelineOptions()
+
+    # On a cache hit detection is skipped entirely, and the models are not even loaded
+    cache = options.get_cache()
+    results = None
+    if cache is not None:
+        with stage('cache_lookup', page) as timing:
+            cache_key = cache.key_for(page.path, options.ocr_fingerprint())
+            results = cache.get(cache_key)
+            timing.set(cache_hit=results is not None)
+
+    if results is None:
+        with stage('model', page):
+            reader = reader or options.get_reader()
+        with stage('readtext', page, detection=options.detection) as timing:
+            results = run_ocr(page, reader, options)
+            timing.set(boxes=len(results))
+        if options.adaptive:
+            with stage('refine', page) as timing:
+                timing.set(low_confidence=sum(1 for bbox, text, prob in results if prob < options.adaptive_threshold))
+                results = refine_low_confidence(page, reader, results, options)
+        if cache is not None:
+            cache.put(cache_key, results)
+    page.results = results
+    return page
+
+def analyze_image(img_path, options=None, reader=None):
+    """
+    Decodes an image once and runs text detection and recognition on it once.
+
+    Args:
+        img_path (str): Path to the input image file.
+        options (PipelineOptions): Pipeline settings. Defaults to PipelineOptions().
+        reader: EasyOCR reader to use instead of the pooled one for the options.
+
+    Returns:
+        OcrPage: The decoded image and its (bbox, text, prob) results.
+    """
+    return ocr_page(decode_page(img_path, options), options, reader)
+
+def write_overlay(page, output_dir, options=None):
+    """
+    Saves a copy of the page with the text bounding boxes and recognized text drawn on top,
+    for checking what the detector found.
+
+    Returns:
+        str: Path of the saved `<name>_detect<ext>` image.
+    """
+    with stage('overlay', page):
+        return _render_overlay(page, output_dir, options or PipelineOptions())
+
+def _render_overlay(page, output_dir, options):
+    image = page.image.convert('RGB') # Always a copy, the page image stays untouched for the PDF
+    font = get_overlay_font()
+
+    # Create drawing object
+    draw = ImageDraw.Draw(image)
+
+    # Round all box corners in one go; bounding boxes are top-left, top-right, bottom-right, bottom-left
+    corners = np.rint(box_corners(page.results)).astype(np.int64).tolist()
+    for points, (bbox, text, prob) in zip(corners, page.results):
+        points = [tuple(point) for point in points]
+        draw.line(points + points[:1], width=2, fill='red') # Draw bounding box
+        draw.text(points[0], text, fill='blue', font=font) # Text on the top-left corner of the box
 
     # Save visualized image
-    img_filename = os.path.basename(img_path)
+    img_filename = os.path.basename(page.path)
     name, ext = os.path.splitext(img_filename)
     output_path = os.path.join(output_dir, f"{name}_detect{ext}")
     image.save(output_path)
-    
-    print(f"Detection visualized image saved to: {output_path}")
 
-def img_to_pdf(img_path, output_dir):
+    if options.verbose:
+        print(f"Detection visualized image saved to: {output_path}", file=sys.stderr)
+    return output_path
+
+def box_extents(results):
     """
-    Converts an image to a PDF file with transparent text labels overlaid on the detected text regions.
-    (MODIFIED TO OVERWRITE IMAGE FILE WITH EXIF-CORRECTED VERSION)
+    Returns the axis-aligned extents of all result boxes at once, as an (n, 4) float array of
+    [x_min, y_min, x_max, y_max] rows in the order of `results`.
+    """
+    if not results:
+        return np.empty((0, 4), dtype=np.float64)
+    corners = box_corners(results)
+    return np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1)
+
+def box_corners(results):
+    """Returns the corner points of all result boxes as one (n, 4, 2) float array."""
+    return np.asarray([bbox for bbox, _, _ in results], dtype=np.float64).reshape(len(results), 4, 2)
+
+def reading_order(results, extents=None):
+    """
+    Works out the reading order of OCR results: columns left to right, and within a column lines top to
+    bottom and boxes left to right. Works on the whole page with NumPy operations:
+
+    1. The page skew is estimated from the median slope of the boxes' top edges and removed from the
+       y coordinates, so the boxes of a skewed line stay on the same line.
+    2. The boxes are split recursively at the widest whitespace gap (XY-cut): a vertical gutter wider than
+       1.5 text heights separates columns, a horizontal gap separates blocks. Each split is found with a sort
+       and a running maximum, O(n log n). A block that looks like a table is not split at its gutters: its
+       boxes line up in rows across them, and there are more than two columns or the cells are much narrower
+       than the gutters, and the gutters do not run down a tall region (COLUMN_MIN_HEIGHT).
+    3. Within each remaining block, boxes are grouped into lines by their y centres and sorted along the line.
+
+    Returns:
+        numpy.ndarray: Indices into `results` in reading order.
+
+    A table is read row by row:
+
+    >>> def cell(x, y, text): return ([[x, y], [x + 80, y], [x + 80, y + 25], [x, y + 25]], text, 0.9)
+    >>> rows = [('Artikel', 'Antal', 'Belopp'), ('Penna', '2', '20'), ('Block', '1', '35'), ('Summa', '3', '55')]
+    >>> table = [cell(x, 32 * row, text) for row, texts in enumerate(rows) for x, text in zip((0, 300, 500), texts)]
+    >>> [table[i][1] for i in reading_order(table)]
+    ['Artikel', 'Antal', 'Belopp', 'Penna', '2', '20', 'Block', '1', '35', 'Summa', '3', '55']
+
+    Text in two columns is read column by column, even when the lines line up across a short section:
+
+    >>> def line(x, y, text): return ([[x, y], [x + 250, y], [x + 250, y + 25], [x, y + 25]], text, 0.9)
+    >>> page = [line(0, 0, 'Title')] + [line(300 * col, 50 + 32 * row, f'c{col}l{row}') for col in (0, 1) for row in range(10)]
+    >>> [page[i][1] for i in reading_order(page)][:13]
+    ['Title', 'c0l0', 'c0l1', 'c0l2', 'c0l3', 'c0l4', 'c0l5', 'c0l6', 'c0l7', 'c0l8', 'c0l9', 'c1l0', 'c1l1']
+    """
+    n = len(results)
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+    if extents is None:
+        extents = box_extents(results)
+    extents = extents.copy()
+
+    # Deskew: rotate the y coordinates by the median angle of the top edges (top-left -> top-right corner)
+    corners = box_corners(results)
+    dx = corners[:, 1, 0] - corners[:, 0, 0]
+    dy = corners[:, 1, 1] - corners[:, 0, 1]
+    valid = dx > 0
+    if valid.any():
+        slope = float(np.median(dy[valid] / dx[valid]))
+        if 0 < abs(slope) < 0.2: # Ignore noise and anything steeper than ~11 degrees
+            centres_x = (extents[:, 0] + extents[:, 2]) / 2
+            extents[:, [1, 3]] -= (centres_x * slope)[:, None]
+
+    heights = extents[:, 3] - extents[:, 1]
+    unit = float(np.median(heights[heights > 0])) if (heights > 0).any() else 1.0
+
+    order = []
+    _xy_cut(np.arange(n), extents, unit, order, depth=0)
+    return np.concatenate(order) if order else np.empty(0, dtype=np.intp)
+
+def _gaps(starts, ends, min_gap):
+    """Positions of the whitespace gaps of at least min_gap between intervals: returns (cut points, gap sizes)."""
+    by_start = np.argsort(starts, kind='stable')
+    reach = np.maximum.accumulate(ends[by_start]) # Furthest point covered so far
+    gap_sizes = starts[by_start][1:] - reach[:-1]
+    wide = gap_sizes >= min_gap
+    return reach[:-1][wide] + gap_sizes[wide] / 2, gap_sizes[wide]
+
+def _rows_align(boxes, parts, unit, tolerance=0.25, min_share=0.8):
+    """
+    True if the boxes on each side of the gutters sit on the same rows: at least `min_share` of them have
+    a box in another part whose y centre is within `tolerance` text heights of their own.
+    """
+    centres_y = (boxes[:, 1] + boxes[:, 3]) / 2
+    matched = 0
+    for part in np.unique(parts):
+        mine = parts == part
+        others = np.sort(centres_y[~mine])
+        nearest = np.clip(np.searchsorted(others, centres_y[mine]), 1, len(others) - 1)
+        distance = np.minimum(np.abs(others[nearest - 1] - centres_y[mine]), np.abs(others[nearest] - centres_y[mine]))
+        matched += np.count_nonzero(distance <= tolerance * unit)
+    return matched >= min_share * len(boxes)
+
+COLUMN_MIN_HEIGHT = 20 # Text heights a gutter must run down to separate columns even though the rows on both sides align
+
+def _is_table(boxes, parts, gaps, unit):
+    """
+    True if the parts of a block split at its gutters look like the columns of a table rather than of text:
+    the block is short, the rows line up across the gutters, and there are more than two columns or the
+    cells are at most half as wide as the widest gutter (text columns are wide next to the space between them).
     """
-    # Initialize EasyOCR reader
-    reader = easyocr.Reader(['sv', 'en'], model_storage_directory=pathlib.Path('./model').resolve())
+    if boxes[:, 3].max() - boxes[:, 1].min() >= COLUMN_MIN_HEIGHT * unit:
+        return False
+    narrow = np.median(boxes[:, 2] - boxes[:, 0]) <= 0.5 * gaps.max()
+    return (len(np.unique(parts)) > 2 or narrow) and _rows_align(boxes, parts, unit)
 
-    # Load image and EXIF handling
+def _xy_cut(indices, extents, unit, order, depth):
+    boxes = extents[indices]
+    if len(indices) > 1 and depth < 32:
+        x_cuts, x_gaps = _gaps(boxes[:, 0], boxes[:, 2], 1.5 * unit) # Column gutters
+        y_cuts, y_gaps = _gaps(boxes[:, 1], boxes[:, 3], 0.5 * unit) # Blank space between blocks
+        if len(x_gaps) and (not len(y_gaps) or x_gaps.max() / 1.5 >= y_gaps.max() / 0.5):
+            parts = np.searchsorted(np.sort(x_cuts), (boxes[:, 0] + boxes[:, 2]) / 2)
+            if _is_table(boxes, parts, x_gaps, unit):
+                # A table: split it into rows (or read it line by line) instead of reading it column by column
+                parts = np.searchsorted(np.sort(y_cuts), (boxes[:, 1] + boxes[:, 3]) / 2) if len(y_gaps) else None
+        elif len(y_gaps):
+            parts = np.searchsorted(np.sort(y_cuts), (boxes[:, 1] + boxes[:, 3]) / 2)
+        else:
+            parts = None
+        if parts is not None:
+            by_part = np.argsort(parts, kind='stable')
+            bounds = np.flatnonzero(np.diff(parts[by_part])) + 1
+            for group in np.split(indices[by_part], bounds):
+                _xy_cut(group, extents, unit, order, depth + 1)
+            return
+
+    # A single block: cluster into lines by y centre, then read each line left to right
+    centres_y = (boxes[:, 1] + boxes[:, 3]) / 2
+    by_y = np.argsort(centres_y, kind='stable')
+    new_line = np.diff(centres_y[by_y]) > 0.5 * unit
+    line_of = np.empty(len(indices), dtype=np.intp)
+    line_of[by_y] = np.concatenate([[0], np.cumsum(new_line)])
+    order.append(indices[np.lexsort((boxes[:, 0], line_of))])
+
+# Compression profiles for the page image embedded in PDFs (PipelineOptions.compression):
+#   dpi: resolution to downsample to, None keeps every pixel. Sources without DPI metadata count as DEFAULT_SOURCE_DPI.
+#   codec: 'jpeg' (at the given quality) or 'flate' (lossless).
+#   grayscale: store colour scans whose pixels are all grey as a single channel.
+#   bilevel: store black-and-white scans as pure black and white, which Flate compresses to a fraction of the size.
+#            ReportLab has no CCITT/JBIG2 encoder, so such pages are written as thresholded 8-bit greyscale.
+COMPRESSION_PROFILES = {
+    'archival': {'dpi': None, 'codec': 'flate', 'grayscale': False, 'bilevel': False},
+    'standard': {'dpi': 300, 'codec': 'jpeg', 'quality': 85, 'grayscale': True, 'bilevel': False},
+    'small': {'dpi': 150, 'codec': 'jpeg', 'quality': 60, 'grayscale': True, 'bilevel': True},
+}
+DEFAULT_SOURCE_DPI = 300
+
+_encode_executor = None
+_encode_executor_lock = threading.Lock()
+
+def source_dpi(img_path):
+    """Horizontal resolution stored in the image file, or DEFAULT_SOURCE_DPI. Only reads the file header."""
     try:
-        image_pil = Image.open(img_path, exif=None)
-    except TypeError:
-        image_pil = Image.open(img_path)
-        try:
-            import PIL.ImageOps
-            image_pil = PIL.ImageOps.exif_transpose(image_pil)
-        except AttributeError:
-            print("Warning: PIL.ImageOps.exif_transpose not available.")
+        with Image.open(img_path) as image:
+            dpi = image.info.get('dpi')
+    except OSError:
+        dpi = None
+    return float(dpi[0]) if dpi and dpi[0] else DEFAULT_SOURCE_DPI
 
-    # **NEW STEP: Overwrite the original image file with the EXIF-corrected Pillow image**
-    image_pil.save(img_path) # Save corrected image back to the original file path
-    print(f"DEBUG: Overwrote original image file with EXIF-corrected version: {img_path}")
+def _sample(image, max_side=512):
+    """A nearest-neighbour sample of the image, cheap enough to take from any scan for colour statistics."""
+    step = max(1, max(image.size) // max_side)
+    if step == 1:
+        return np.asarray(image)
+    return np.asarray(image.resize((image.width // step, image.height // step), Image.NEAREST))
+
+def is_grayscale(image, tolerance=12):
+    """True for an RGB image whose channels (nearly) agree everywhere, e.g. a greyscale scan saved as colour."""
+    spread = _sample(image).astype(np.int16)
+    spread = spread.max(axis=2) - spread.min(axis=2)
+    return float(np.percentile(spread, 99)) <= tolerance
+
+def is_bilevel(image, max_midtones=0.06):
+    """True for a greyscale image that is almost only black and white, such as a scanned text page."""
+    sample = _sample(image)
+    midtones = np.count_nonzero((sample > 64) & (sample < 192))
+    return midtones <= max_midtones * sample.size
+
+def encode_page_image(page, options=None):
+    """
+    Prepares the page image for embedding according to options.compression (see COMPRESSION_PROFILES).
+
+    Returns:
+        The source path when the original JPEG data can be embedded as is, otherwise a ReportLab ImageReader
+        holding either the encoded JPEG stream or the pixels that ReportLab compresses with Flate.
+    """
+    options = options or PipelineOptions()
+    from reportlab.lib.utils import ImageReader
 
+    if options.compression is None:
+        # ReportLab copies a JPEG file's compressed stream straight into the PDF,
+        # anything else is encoded from the already decoded pixels instead of being read from disk again.
+        if options.jpeg_passthrough and page.can_passthrough:
+            return page.path
+        return ImageReader(page.image)
 
-    image_np = np.array(image_pil)
-    img_width, img_height = image_pil.size
-    print(f"Image width: {img_width}, height: {img_height}") # VERIFY DIMENSIONS
+    settings = COMPRESSION_PROFILES[options.compression]
+    with stage('encode', page, compression=options.compression) as timing:
+        scale = 1.0
+        if settings['dpi'] is not None:
+            scale = min(1.0, settings['dpi'] / source_dpi(page.path))
+        # The original JPEG data is never larger than a re-encoded copy of the same pixels
+        if options.jpeg_passthrough and page.can_passthrough and scale == 1.0:
+            timing.set(codec='passthrough')
+            return page.path
 
-    # Detect text
-    results = reader.readtext(image_np)
+        # Colour checks run on the full resolution image, before resampling blurs black and white into grey
+        image = page.image
+        if settings['grayscale'] and image.mode == 'RGB' and is_grayscale(image):
+            image = image.convert('L')
+        codec = settings['codec']
+        if settings['bilevel'] and image.mode == 'L' and is_bilevel(image):
+            codec = 'bilevel'
 
-    # Sort text boxes for reading order (top-to-bottom, left-to-right)
-    results.sort(key=lambda res: (res[0][0][1], res[0][0][0]))
+        if scale < 1.0:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+        if codec == 'bilevel':
+            image = image.point([0] * 128 + [255] * 128)
+        timing.set(codec=codec, size=image.size)
 
-    # Create PDF canvas
-    pdf_filename = os.path.basename(img_path)
+        if codec == 'jpeg':
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=settings['quality'], optimize=True)
+            buffer.seek(0)
+            return ImageReader(buffer)
+        return ImageReader(image)
+
+def start_page_encoding(page, options):
+    """
+    Starts encode_page_image() for a page on a background thread, so that it runs while the page is OCR'd
+    (PIL releases the GIL while resizing and encoding). The result is picked up by draw_pdf_page().
+    """
+    global _encode_executor
+    if options.compression is None or 'pdf' not in options.outputs:
+        return
+    if _encode_executor is None:
+        with _encode_executor_lock:
+            if _encode_executor is None:
+                _encode_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=max(1, (os.cpu_count() or 2) // 2), thread_name_prefix='img2pdf-encode')
+    # Convert memory-mapped pixels and decode a lazily opened image here: the encoder and OCR read the same
+    # image, and PIL's load() is not safe to run from two threads at once
+    page.image.load()
+    page.encoded = _encode_executor.submit(encode_page_image, page, options)
+
+def draw_pdf_page(c, page, options=None):
+    """
+    Draws the page image and its transparent text labels on the current page of a ReportLab canvas,
+    resizing the canvas page to the image. The caller finishes the page with showPage() or save().
+    The source file is never modified: the decoded image is handed to ReportLab from memory, and
+    unrotated JPEG sources are embedded with their original DCT data (see PipelineOptions.jpeg_passthrough).
+    With options.compression set the image is downsampled and re-encoded first, see encode_page_image().
+    """
+    options = options or PipelineOptions()
+
+    img_width, img_height = page.size
+    c.setPageSize((img_width, img_height)) # Use image dimensions as page size
+
+    # Embed image in PDF, scaled to the page even when it was downsampled
+    if page.encoded is not None:
+        page_image = page.encoded.result() # Encoded in the background by start_page_encoding()
+    else:
+        page_image = encode_page_image(page, options)
+    with stage('image_embed', page, passthrough=isinstance(page_image, str)):
+        c.drawImage(page_image, 0, 0, width=img_width, height=img_height)
+
+    with stage('layout', page, boxes=len(page.results)):
+        extents, order = page.layout
+    with stage('text_layer', page):
+        _draw_text_layer(c, page, order, extents)
+
+def _draw_text_layer(c, page, order, extents):
+    """
+    Writes all the OCR text of the page as a single invisible text object (render mode 3), in reading order.
+    The font, size and horizontal scale are only set when they change, so the content stream holds little
+    more than one position and one string per box. Each string is stretched to the width of its box, so
+    selecting the text in a viewer highlights the words on the image.
+    """
+    if len(order) == 0:
+        return
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    img_width, img_height = page.size
+    font_name = get_pdf_font()
+    text = c.beginText()
+    text.setTextRenderMode(3) # Neither fill nor stroke: searchable and selectable, but invisible
+    current_size = None
+    current_scale = 100
+
+    for index in order:
+        bbox, label, prob = page.results[index]
+        if not label:
+            continue
+        x_min, y_min, x_max, y_max = (float(v) for v in extents[index])
+
+        # Font size 8 or 80% of the textbox height, whichever is larger
+        font_size = max(8, int((y_max - y_min) * 0.8))
+        if font_size != current_size:
+            text.setFont(font_name, font_size)
+            current_size = font_size
+
+        natural_width = stringWidth(label, font_name, font_size)
+        scale = round(100 * (x_max - x_min) / natural_width, 1) if natural_width > 0 else 100
+        if scale != current_scale:
+            text.setHorizScale(scale)
+            current_scale = scale
+
+        # ReportLab uses bottom-left origin, EasyOCR uses top-left: the baseline goes on the bottom edge of the box
+        text.setTextOrigin(x_min, img_height - y_max)
+        text.textOut(label)
+
+    c.drawText(text)
+
+def write_pdf(page, output_dir, options=None):
+    """
+    Writes the page as a PDF with transparent text labels overlaid on the detected text regions.
+
+    Returns:
+        str: Path of the saved `<name>.pdf` file.
+    """
+    options = options or PipelineOptions()
+    pdf_filename = os.path.basename(page.path)
     name, ext = os.path.splitext(pdf_filename)
     output_pdf_path = os.path.join(output_dir, f"{name}.pdf")
 
-    c = canvas.Canvas(output_pdf_path, pagesize=(img_width, img_height)) # Use image dimensions as page size
+    from reportlab.pdfgen import canvas
+    c = canvas.Canvas(output_pdf_path, pagesize=page.size)
+    draw_pdf_page(c, page, options)
+    with stage('pdf_save', page):
+        c.save()
+    if options.verbose:
+        print(f"PDF with transparent text labels saved to: {output_pdf_path}", file=sys.stderr)
+    return output_pdf_path
+
+# Structured exports of the OCR results, so that indexers can read the text without parsing PDFs.
+# Words are written in reading order with integer pixel boxes (x_min, y_min, x_max, y_max).
+HOCR_HEADER = '''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml">
+ <head>
+  <title></title>
+  <meta http-equiv="Content-Type" content="text/html;charset=utf-8"/>
+  <meta name="ocr-system" content="img2pdf (EasyOCR)"/>
+  <meta name="ocr-capabilities" content="ocr_page ocr_line ocrx_word"/>
+ </head>
+ <body>
+'''
+HOCR_FOOTER = ''' </body>
+</html>
+'''
+ALTO_HEADER = '''<?xml version="1.0" encoding="UTF-8"?>
+<alto xmlns="http://www.loc.gov/standards/alto/ns-v4#">
+ <Description>
+  <MeasurementUnit>pixel</MeasurementUnit>
+ </Description>
+ <Layout>
+'''
+ALTO_FOOTER = ''' </Layout>
+</alto>
+'''
+
+def export_words(page):
+    """The page's results as (text, confidence, (x_min, y_min, x_max, y_max)) tuples in reading order."""
+    extents, order = page.layout
+    return [(page.results[i][1], float(page.results[i][2]), tuple(int(round(v)) for v in extents[i])) for i in order]
 
-    # Embed image in PDF - using the *same* img_path now, but it's overwritten with the corrected image
-    c.drawImage(img_path, 0, 0, width=img_width, height=img_height)
+def format_hocr_page(page, page_number=1):
+    width, height = page.size
+    lines = [f'  <div class="ocr_page" id="page_{page_number}" title=\'image "{html.escape(str(page.path))}"; '
+             f'bbox 0 0 {width} {height}; ppageno {page_number - 1}\'>\n']
+    for i, (text, confidence, (x0, y0, x1, y1)) in enumerate(export_words(page), start=1):
+        lines.append(f'   <span class="ocr_line" id="line_{page_number}_{i}" title="bbox {x0} {y0} {x1} {y1}">'
+                     f'<span class="ocrx_word" id="word_{page_number}_{i}" title="bbox {x0} {y0} {x1} {y1}; x_wconf {round(confidence * 100)}">'
+                     f'{html.escape(text)}</span></span>\n')
+    lines.append('  </div>\n')
+    return ''.join(lines)
 
-    # Prepare for text linking (initially just overlay text)
-    linked_text_objects = []
-    last_text_label_name = None
+def format_alto_page(page, page_number=1):
+    width, height = page.size
+    lines = [f'  <!-- {html.escape(str(page.path)).replace("--", "&#45;&#45;")} -->\n',
+             f'  <Page ID="page_{page_number}" PHYSICAL_IMG_NR="{page_number}" WIDTH="{width}" HEIGHT="{height}">\n',
+             f'   <PrintSpace HPOS="0" VPOS="0" WIDTH="{width}" HEIGHT="{height}">\n',
+             f'    <TextBlock ID="block_{page_number}">\n']
+    for i, (text, confidence, (x0, y0, x1, y1)) in enumerate(export_words(page), start=1):
+        box = f'HPOS="{x0}" VPOS="{y0}" WIDTH="{x1 - x0}" HEIGHT="{y1 - y0}"'
+        lines.append(f'     <TextLine ID="line_{page_number}_{i}" {box}><String ID="string_{page_number}_{i}" {box} '
+                     f'CONTENT="{html.escape(text)}" WC="{confidence:.4f}"/></TextLine>\n')
+    lines.append('    </TextBlock>\n   </PrintSpace>\n  </Page>\n')
+    return ''.join(lines)
 
-    for i, (bbox, text, prob) in enumerate(results):
-        # Bounding box coordinates from EasyOCR are top-left, top-right, bottom-right, bottom-left
-        x_min = min([coord[0] for coord in bbox])
-        x_max = max([coord[0] for coord in bbox])
-        y_min = min([coord[1] for coord in bbox])
-        y_max = max([coord[1] for coord in bbox])
+def format_jsonl_page(page, page_number=1):
+    width, height = page.size
+    record = {'image': str(page.path), 'page': page_number, 'width': width, 'height': height,
+              'words': [{'text': text, 'confidence': round(confidence, 4), 'bbox': list(box)} for text, confidence, box in export_words(page)]}
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
 
-        text_label_name = f"textlabel_{i}"
+# Export format -> (file extension, file header, file footer, page formatter). The header and footer wrap
+# every file, whether it holds one page or is a rolling file of a whole batch.
+EXPORT_FORMATS = {
+    'hocr': ('.hocr', HOCR_HEADER, HOCR_FOOTER, format_hocr_page),
+    'alto': ('.alto.xml', ALTO_HEADER, ALTO_FOOTER, format_alto_page),
+    'jsonl': ('.jsonl', '', '', format_jsonl_page),
+}
 
-        # ReportLab uses bottom-left origin, EasyOCR uses top-left. Need to convert y-coordinates.
-        reportlab_y = img_height - y_max # Bottom edge of bbox in ReportLab coords
-        text_height = y_max - y_min # Height of the textbox
+class ExportSink:
+    """
+    Streams the pages of one export format into a rolling series of files `<prefix>-00001<ext>`,
+    `<prefix>-00002<ext>`, ..., starting a new file once the current one reaches `max_bytes`, instead of
+    writing one file per page. Every page is flushed as soon as it is written. Existing files are never
+    overwritten, a new run continues with the next free number. In worker processes the process id is
+    added to the names, so that processes never share a file.
 
-        # Set transparent text color
-        c.setFillAlpha(0) # Make text fully transparent, 0 for transparent, 1 for opaque
+    Safe to share between threads.
 
-        # Choose font and size - adjust size dynamically if needed based on bbox height
-        font_size = max(8, int(text_height * 0.8)) # Example: font size 8 or 80% of textbox height, whichever is larger
-        c.setFont(DEFAULT_FONT, font_size) # Use registered font or fallback
+    Args:
+        prefix (str): Path prefix of the files. Its directory is created if needed.
+        fmt (str): Name from EXPORT_FORMATS.
+        max_bytes (int): Size at which a file is closed and the next one started.
+    """
+    def __init__(self, prefix, fmt, max_bytes=256 * 1024 * 1024):
+        self.prefix = str(prefix)
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        if multiprocessing.parent_process() is not None:
+            self.prefix += f"-{os.getpid()}"
+        pathlib.Path(self.prefix).parent.mkdir(parents=True, exist_ok=True)
 
-        # Draw the text as transparent label
-        textobject = c.beginText()
-        textobject.setTextOrigin(x_min, reportlab_y) # Position of the text
-        textobject.textLine(text) # Text content
-        c.drawText(textobject)
+        self._lock = threading.Lock()
+        self._file = None
+        self._index = 0
+        self._pages = 0
+        self.path = None
 
+    def write_page(self, page):
+        """Appends a page and returns the path of the file it was written to."""
+        extension, header, footer, format_page = EXPORT_FORMATS[self.fmt]
+        with self._lock:
+            if self._file is None or self._file.tell() >= self.max_bytes:
+                self._roll()
+            self._pages += 1
+            self._file.write(format_page(page, self._pages))
+            self._file.flush()
+            return self.path
 
-        # Basic linking (sequential linking - last of previous to first of current) - simplified for now.
-        # More robust layout analysis needed for complex documents.
-        if last_text_label_name:
-            # In a real scenario, you would use reportlab's bookmark/annotation features to create links between text labels.
-            # This is a placeholder. For now, we are just overlaying the text.
-            pass # Linking logic would go here in a more advanced implementation.
+    def _roll(self):
+        extension, header, footer, format_page = EXPORT_FORMATS[self.fmt]
+        self._close()
+        while True:
+            self._index += 1
+            self.path = f"{self.prefix}-{self._index:05d}{extension}"
+            if not os.path.exists(self.path):
+                break
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write(header)
+        self._pages = 0
 
-        last_text_label_name = text_label_name
+    def _close(self):
+        if self._file is not None:
+            self._file.write(EXPORT_FORMATS[self.fmt][2]) # Footer
+            self._file.close()
+            self._file = None
 
+    def close(self):
+        with self._lock:
+            self._close()
 
-    c.save()
-    print(f"PDF with transparent text labels saved to: {output_pdf_path}")
+_export_sinks = {}
+_export_sinks_lock = threading.Lock()
 
+def get_export_sink(prefix, fmt, max_bytes=256 * 1024 * 1024):
+    """Returns the process-wide ExportSink for a prefix and format, opening it on first use."""
+    key = (str(pathlib.Path(prefix).resolve()), fmt)
+    with _export_sinks_lock:
+        sink = _export_sinks.get(key)
+        if sink is None:
+            if not _export_sinks:
+                # Also runs when a worker process exits, unlike atexit handlers
+                multiprocessing.util.Finalize(None, close_export_sinks, exitpriority=10)
+            sink = _export_sinks[key] = ExportSink(prefix, fmt, max_bytes)
+    return sink
+
+def close_export_sinks():
+    """Finishes every open rolling export file (writing the closing tags of hOCR and ALTO files)."""
+    with _export_sinks_lock:
+        for sink in _export_sinks.values():
+            sink.close()
+        _export_sinks.clear()
+
+def write_export(fmt, page, output_dir, options=None):
+    """
+    Writes the page's OCR results in an export format from EXPORT_FORMATS: to `<name><ext>` next to the other
+    outputs, or appended to the rolling files of options.export_path if that is set (see ExportSink).
+
+    Returns:
+        str: Path of the file the page was written to.
+    """
+    options = options or PipelineOptions()
+    with stage('export', page, format=fmt):
+        if options.export_path is not None:
+            return get_export_sink(options.export_path, fmt, options.export_max_bytes).write_page(page)
+
+        extension, header, footer, format_page = EXPORT_FORMATS[fmt]
+        name, ext = os.path.splitext(os.path.basename(page.path))
+        output_path = os.path.join(output_dir, f"{name}{extension}")
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(header + format_page(page) + footer)
+        return output_path
+
+# Output writers selectable through PipelineOptions.outputs. Each takes (page, output_dir, options) and returns the written path.
+OUTPUT_WRITERS = {
+    'pdf': write_pdf,
+    'overlay': write_overlay,
+    'hocr': functools.partial(write_export, 'hocr'),
+    'alto': functools.partial(write_export, 'alto'),
+    'jsonl': functools.partial(write_export, 'jsonl'),
+}
+
+def process_image(img_path, output_dir, options=None, reader=None):
+    """
+    Decodes and OCRs an image once, then hands the same results to every requested output writer.
+
+    Args:
+        img_path (str): Path to the input image file.
+        output_dir (str): Directory to save the outputs in.
+        options (PipelineOptions): Pipeline settings, including which outputs to write.
+        reader: EasyOCR reader to use instead of the pooled one for the options.
+
+    Returns:
+        dict: Output name -> path of the written file.
+    """
+    return process_page(decode_page(img_path, options), output_dir, options, reader)
+
+def process_page(page, output_dir, options=None, reader=None):
+    """
+    Same as process_image() for an image that was already decoded, e.g. by an ImagePrefetcher.
+    The page's pixels are released once every output is written.
+    """
+    options = options or PipelineOptions()
+    unknown = [name for name in options.outputs if name not in OUTPUT_WRITERS]
+    if unknown:
+        raise ValueError(f"Unknown output(s): {', '.join(unknown)}")
+
+    try:
+        if not screen_and_ocr(page, options, reader):
+            return {} # Dropped by screening, see page.screen
+        return {name: OUTPUT_WRITERS[name](page, output_dir, options) for name in options.outputs}
+    finally:
+        page.release()
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp')
+
+def natural_sort_key(path):
+    """Sort key that orders numbered scans naturally, e.g. page2 before page10."""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', str(path))]
+
+def list_images(directory, recursive=False):
+    """Returns the image files in a directory in natural sort order."""
+    pattern = '**/*' if recursive else '*'
+    paths = [p for p in pathlib.Path(directory).glob(pattern) if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS]
+    return sorted(paths, key=natural_sort_key)
+
+PDF_CHUNK_PAGES = 8 # Pages images_to_pdf() holds in one ReportLab document before appending it to the output
+
+_PDF_REF = re.compile(rb'(\d+) 0 R\b')
+_PDF_NAMED_REF = re.compile(rb'/([^\s/\[\]<>()]+)\s+(\d+) 0 R\b')
+_PDF_XREF_ENTRY = re.compile(rb'(\d{10}) \d{5} ([nf])')
+_PDF_STREAM = re.compile(rb'>>\s*stream\r?\n')
+
+class IncrementalPdfWriter:
+    """
+    Writes one PDF from the pages of a series of smaller PDF documents, appending the objects of each document
+    to the file as soon as it is added, so that memory use does not grow with the page count. Objects are copied
+    byte for byte, with their references renumbered; the documents must have a classic xref table, no object
+    streams and a flat page tree, as ReportLab writes them.
+
+    Fonts are the exception: the font dictionary of the page resources and everything it references are held
+    back and written once, by close(). Each font object is identified by its path from the font dictionary
+    (e.g. /F2+0 /FontDescriptor /FontFile2), and the copy from the latest document wins, so the documents must
+    build on each other's font subsets, as images_to_pdf() makes ReportLab do (see _continue_font_subsets()).
+
+    The file is written under a temporary name and only moved into place by close(), so that a failed or
+    interrupted run does not leave a truncated PDF behind.
+    """
+    def __init__(self, path):
+        self.path = str(path)
+        self._partial_path = f"{self.path}.part"
+        self._file = open(self._partial_path, 'wb')
+        self._file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._offsets = [None, None] # Object number - 1 -> file offset; 1 and 2 are the catalog and page tree
+        self._pages = []
+        self._font_numbers = {} # Path from the font dictionary -> object number, reserved until close()
+        self._font_objects = {} # Path -> latest object body, with its references renumbered
+        self._font_names = {} # Resource name (e.g. b'F2+0') of every font in the font dictionary -> its path
+
+    def _reserve(self):
+        self._offsets.append(None)
+        return len(self._offsets)
+
+    def add_document(self, data):
+        """Appends the pages of a complete PDF document (bytes) after the pages added so far."""
+        xref = data.rindex(b'\nxref') + 1
+        offsets = sorted((int(offset), number) for number, (offset, kind) in enumerate(_PDF_XREF_ENTRY.findall(data, xref)) if kind == b'n')
+        trailer = data[data.rindex(b'trailer'):]
+        root = int(re.search(rb'/Root (\d+) 0 R', trailer).group(1))
+        info = re.search(rb'/Info (\d+) 0 R', trailer)
+        ends = [offset for offset, _ in offsets[1:]] + [xref]
+        spans = {} # Object number -> (start, end of the dictionary, end) of its body
+        for (start, number), end in zip(offsets, ends):
+            start = data.index(b'obj', start, end) + 3
+            end = data.rindex(b'endobj', start, end)
+            stream = _PDF_STREAM.search(data, start, end)
+            spans[number] = (start, stream.end() if stream else end, end) # Stream data holds no references
+
+        def head(number):
+            start, split, end = spans[number]
+            return data[start:split]
+        page_tree = int(re.search(rb'/Pages (\d+) 0 R', head(root)).group(1))
+        kids = [int(number) for number in _PDF_REF.findall(re.search(rb'/Kids \[(.*?)\]', head(page_tree), re.S).group(1))]
+
+        # The font dictionaries of the pages and the objects they lead to, by path
+        font_paths = {}
+        pending = [(int(number), ()) for number in set(re.findall(rb'/Font (\d+) 0 R', b''.join(head(kid) for kid in kids)))]
+        while pending:
+            number, path = pending.pop()
+            if number not in font_paths:
+                font_paths[number] = path
+                pending.extend((int(child), path + (name,)) for name, child in _PDF_NAMED_REF.findall(head(number)))
+
+        # The document's catalog, page tree and info are replaced by this file's own
+        skipped = {root, page_tree} | ({int(info.group(1))} if info else set())
+        numbers = {page_tree: 2} # Pages point at the new page tree as their /Parent
+        for number in spans:
+            if number in font_paths:
+                path = font_paths[number]
+                if path not in self._font_numbers:
+                    self._font_numbers[path] = self._reserve()
+                numbers[number] = self._font_numbers[path]
+            elif number not in skipped:
+                numbers[number] = self._reserve()
+        renumber = lambda match: b'%d 0 R' % numbers[int(match.group(1))]
+
+        for number, (start, split, end) in spans.items():
+            if number in skipped:
+                continue
+            if number in font_paths:
+                path = font_paths[number]
+                if path:
+                    self._font_objects[path] = _PDF_REF.sub(renumber, data[start:split]) + data[split:end]
+                else: # The font dictionary itself is written from the names of all documents
+                    self._font_names.update((name, (name,)) for name, _ in _PDF_NAMED_REF.findall(data[start:split]))
+                continue
+            self._offsets[numbers[number] - 1] = self._file.tell()
+            self._file.write(b'%d 0 obj' % numbers[number])
+            self._file.write(_PDF_REF.sub(renumber, data[start:split]))
+            self._file.write(memoryview(data)[split:end])
+            self._file.write(b'endobj\n')
+        self._pages.extend(numbers[number] for number in kids)
+
+    def close(self):
+        """Writes the fonts, page tree, catalog and cross-reference table and moves the file into place."""
+        for path, number in self._font_numbers.items():
+            self._offsets[number - 1] = self._file.tell()
+            if path:
+                self._file.write(b'%d 0 obj%sendobj\n' % (number, self._font_objects[path]))
+            else:
+                fonts = b' '.join(b'/%s %d 0 R' % (name, self._font_numbers[path]) for name, path in sorted(self._font_names.items()))
+                self._file.write(b'%d 0 obj\n<< %s >>\nendobj\n' % (number, fonts))
+        self._offsets[1] = self._file.tell()
+        kids = b' '.join(b'%d 0 R' % number for number in self._pages)
+        self._file.write(b'2 0 obj\n<< /Type /Pages /Count %d /Kids [ %s ] >>\nendobj\n' % (len(self._pages), kids))
+        self._offsets[0] = self._file.tell()
+        self._file.write(b'1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n')
+        xref = self._file.tell()
+        self._file.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(self._offsets) + 1))
+        self._file.write(b''.join(b'%010d 00000 n \n' % offset for offset in self._offsets))
+        self._file.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(self._offsets) + 1, xref))
+        self._file.close()
+        os.replace(self._partial_path, self.path)
+
+    def abort(self):
+        """Closes and deletes the partly written file."""
+        self._file.close()
+        try:
+            os.remove(self._partial_path)
+        except OSError:
+            pass
+
+def _continue_font_subsets(c, states):
+    """
+    Makes the TrueType text font of a new ReportLab canvas carry on the character subsets of the canvases
+    before it (kept in `states`) instead of starting its own, so that the chunks of images_to_pdf() all encode
+    text the same way and the last chunk's font subsets cover every earlier page. IncrementalPdfWriter then
+    embeds the font once per document.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    font = pdfmetrics.getFont(get_pdf_font())
+    if not getattr(font, '_dynamicFont', False):
+        return # A standard font, which is not embedded
+    state = states.get(font.fontName)
+    if state is None:
+        states[font.fontName] = font._assignState(c._doc)
+    else:
+        state.frozen = 0 # Saving the previous chunk froze the subsets
+        state.internalName = None # Registered with the new document on first use, under the same name
+        font.state[c._doc] = state
+
+def images_to_pdf(inputs, output_pdf_path, options=None, reader=None, progress=None, chunk_pages=PDF_CHUNK_PAGES):
+    """
+    Combines an ordered list of images (or every image in a directory) into one multi-page searchable PDF.
+
+    Pages are processed one at a time: each is OCR'd, drawn and finished with showPage(), and its decoded
+    pixels and OCR results are released before the next page is OCR'd. Only the next options.prefetch
+    images are decoded ahead. Every `chunk_pages` pages the ReportLab document is saved and appended to the
+    output by an IncrementalPdfWriter, so memory use stays flat however many pages there are. The chunks share
+    their font subsets, so the font is still embedded once per document.
+    Outputs other than 'pdf' in options.outputs are still written per page next to the document.
+
+    Args:
+        inputs (str or list): A directory, or image paths in page order.
+        output_pdf_path (str): Path of the PDF to write.
+        options (PipelineOptions): Pipeline settings.
+        reader: EasyOCR reader to use instead of the pooled one for the options.
+        progress (callable): Called as progress(img_path, page_number) after each page is drawn, with a screen=
+            keyword argument (see screen_page()) for pages flagged by screening. Dropped pages get page_number None.
+        chunk_pages (int): Pages per ReportLab document appended to the output.
+
+    Returns:
+        str: output_pdf_path.
+    """
+    options = options or PipelineOptions()
+    if isinstance(inputs, (str, os.PathLike)) and os.path.isdir(inputs):
+        inputs = list_images(inputs)
+    if not inputs:
+        raise ValueError("No images to combine into a PDF")
+
+    output_dir = os.path.dirname(os.path.abspath(output_pdf_path))
+    extra_outputs = [name for name in options.outputs if name != 'pdf']
+
+    from reportlab.pdfgen import canvas
+    writer = IncrementalPdfWriter(output_pdf_path)
+    c = buffer = None
+    font_states = {}
+
+    def flush():
+        c.save()
+        writer.add_document(buffer.getvalue())
+
+    try:
+        # The next pages are decoded in the background while the current one is OCR'd
+        page_number = 0
+        for img_path, page in prefetch_pages([str(p) for p in inputs], options, options.prefetch):
+            if not screen_and_ocr(page, options, reader):
+                page.release()
+                if progress is not None:
+                    progress(img_path, None, screen=page.screen)
+                continue
+            page_number += 1
+            if c is None:
+                buffer = io.BytesIO()
+                c = canvas.Canvas(buffer)
+                _continue_font_subsets(c, font_states)
+            draw_pdf_page(c, page, options)
+            c.showPage() # Finishes the page; ReportLab does not touch the image again
+            for name in extra_outputs:
+                OUTPUT_WRITERS[name](page, output_dir, options)
+            page.release()
+            screen = page.screen
+            del page
+            if page_number % chunk_pages == 0:
+                flush()
+                c = buffer = None
+            if progress is not None:
+                progress(img_path, page_number, **({'screen': screen} if screen else {}))
+
+        if c is not None:
+            flush()
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    if options.verbose:
+        print(f"Multi-page PDF with {page_number} page(s) saved to: {output_pdf_path}", file=sys.stderr)
+    return output_pdf_path
+
+def draw_bounds_before_process(img_path, output_dir, options=None):
+    """
+    Detects text in an image using EasyOCR, visualizes the text bounding boxes and recognized text on the image,
+    and saves the visualized image.
+
+    Args:
+        img_path (str): Path to the input image file.
+        output_dir (str): Directory to save the output visualized image.
+    """
+    options = (options or PipelineOptions()).replace(outputs=('overlay',))
+    return process_image(img_path, output_dir, options)['overlay']
+
+def img_to_pdf(img_path, output_dir, options=None):
+    """
+    Converts an image to a PDF file with transparent text labels overlaid on the detected text regions.
+    Pass options with more outputs (e.g. ('pdf', 'overlay')) to write them from the same OCR pass.
+    """
+    options = options or PipelineOptions()
+    if 'pdf' not in options.outputs:
+        options = options.replace(outputs=('pdf',) + options.outputs)
+    return process_image(img_path, output_dir, options)['pdf']
+
+
+def default_worker_count():
+    """A conservative worker count: OCR inference already uses several cores per job."""
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+class BatchScheduler:
+    """
+    Runs jobs on a fixed number of workers with a bounded backlog.
+
+    submit() blocks while `max_pending` jobs are queued or running, so a producer can never get further
+    ahead of the workers than that (backpressure), no matter how many files are in the batch.
+    cancel() stops accepting jobs and drops the ones that have not started yet; running jobs finish.
+
+    Thread mode shares one set of pooled readers between all workers. Process mode sidesteps the GIL
+    for decoding and PDF writing, at the cost of loading a copy of the models in every worker process.
+
+    Args:
+        max_workers (int): Number of workers. Defaults to default_worker_count().
+        max_pending (int): Jobs allowed to be queued or running at once. Defaults to twice the workers,
+            or the workers plus options.prefetch when images are prefetched.
+        mode (str): 'thread' or 'process'.
+        options (PipelineOptions): When given, each worker warms up the reader for these options on start,
+            and in thread mode submit_image() decodes queued images ahead if options.prefetch is set.
+    """
+    def __init__(self, max_workers=None, max_pending=None, mode='thread', options=None):
+        self.max_workers = max_workers or default_worker_count()
+        self.mode = mode
+
+        self._prefetcher = None
+        if mode == 'thread' and options is not None and options.prefetch > 0:
+            # Queued images are decoded while the workers OCR the running ones, so the backlog is the prefetch depth
+            self._prefetcher = ImagePrefetcher(options, threads=min(options.prefetch, 2))
+            max_pending = max_pending or self.max_workers + options.prefetch
+        self.max_pending = max(max_pending or 2 * self.max_workers, self.max_workers)
+
+        initargs = ()
+        initializer = None
+        if options is not None:
+            initializer = warm_up_readers
+            initargs = ([{'languages': options.languages, 'model_dir': options.model_dir, 'gpu': options.gpu}],)
+
+        if mode == 'thread':
+            self._executor = concurrent.futures.ThreadPoolExecutor(self.max_workers, thread_name_prefix="img2pdf-worker",
+                                                                   initializer=initializer, initargs=initargs)
+        elif mode == 'process':
+            self._executor = concurrent.futures.ProcessPoolExecutor(self.max_workers, initializer=initializer, initargs=initargs)
+        else:
+            raise ValueError(f"Unknown scheduler mode: {mode}")
+
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._cancelled = threading.Event()
+        self._futures = set()
+        self._futures_lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def submit(self, fn, *args, callback=None):
+        """
+        Queues fn(*args), blocking while the backlog is full.
+
+        Args:
+            callback (callable): Called with the finished, failed or cancelled Future, from a worker
+                (or executor management) thread.
+
+        Returns:
+            concurrent.futures.Future: The job, or None if the scheduler was cancelled before it could be queued.
+        """
+        if not self._acquire_slot():
+            return None
+        return self._start(fn, args, callback)
+
+    def submit_image(self, img_path, output_dir, options, callback=None):
+        """
+        Queues run_job() for an image, blocking while the backlog is full. In thread mode with prefetching,
+        the image starts decoding as soon as it is queued, so it is ready when a worker picks it up.
+
+        Returns:
+            concurrent.futures.Future: The job, or None if the scheduler was cancelled before it could be queued.
+        """
+        if not self._acquire_slot():
+            return None
+        decoded = self._prefetcher.submit(img_path, options) if self._prefetcher is not None else None
+        return self._start(run_job, (img_path, output_dir, options, decoded), callback)
+
+    def _acquire_slot(self):
+        while not self._slots.acquire(timeout=0.1):
+            if self._cancelled.is_set():
+                return False
+        if self._cancelled.is_set():
+            self._slots.release()
+            return False
+        return True
+
+    def _start(self, fn, args, callback):
+        future = self._executor.submit(fn, *args)
+        with self._futures_lock:
+            self._futures.add(future)
+        future.add_done_callback(lambda f: self._job_done(f, callback))
+        return future
+
+    def _job_done(self, future, callback):
+        with self._futures_lock:
+            self._futures.discard(future)
+        self._slots.release()
+        if callback is not None:
+            callback(future)
+
+    def cancel(self):
+        """Stops accepting jobs and cancels every job that has not started yet."""
+        self._cancelled.set()
+        with self._futures_lock:
+            pending = list(self._futures)
+        for future in pending:
+            future.cancel()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        if self._prefetcher is not None:
+            self._prefetcher.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is not None:
+            self.cancel()
+        self.shutdown(wait=True)
+
+
+_profile_lock = threading.Lock() # Held by the job being profiled, see run_job()
+
+def run_job(img_path, output_dir, options, decoded=None):
+    """
+    Batch job for one image: processes it and reports how long that took.
+    Module-level so it can be sent to worker processes.
+
+    Args:
+        decoded (concurrent.futures.Future): The page being decoded by an ImagePrefetcher (thread mode only).
+
+    Returns:
+        dict: {'outputs': output name -> path, 'seconds': processing time, 'source': size, mtime and hash of the input
+        as it was processed (see JobManifest.finish())}, plus 'screen' (see screen_page()) when
+        screening flagged the page, 'timings' (see summarize_timings()) when options.instrument is set and
+        'profile' when the job was profiled. Pages dropped by screening have no outputs.
+    """
+    profiler = None
+    if options.profile_dir and fnmatch.fnmatch(os.path.basename(img_path), options.profile_pattern):
+        import cProfile
+        # Only one profiler can be active per process from Python 3.12 on, so profiled jobs in worker
+        # threads take turns (unprofiled jobs keep running alongside)
+        _profile_lock.acquire()
+        try:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        except BaseException:
+            _profile_lock.release()
+            raise
+
+    started = time.perf_counter()
+    try:
+        stat = os.stat(img_path)
+        source = {'size': stat.st_size, 'mtime': stat.st_mtime, 'hash': file_sha256(img_path)}
+        page = decoded.result() if decoded is not None else decode_page(img_path, options)
+        outputs = process_page(page, output_dir, options)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+    result = {'outputs': outputs, 'seconds': time.perf_counter() - started, 'source': source}
+
+    if page.screen is not None:
+        result['screen'] = page.screen
+    if page.timings is not None:
+        result['timings'] = summarize_timings(page.timings)
+    if profiler is not None:
+        os.makedirs(options.profile_dir, exist_ok=True)
+        profile_path = os.path.join(options.profile_dir, f"{pathlib.Path(img_path).stem}.prof")
+        profiler.dump_stats(profile_path) # Inspect with python -m pstats or snakeviz
+        result['profile'] = profile_path
+    return result
+
+def discover_inputs(patterns, output_dir, recursive=False):
+    """
+    Expands files, directories and glob patterns into the images to process.
+
+    Images found under a directory keep their relative sub-directory below output_dir, so scans with the
+    same name in different folders do not overwrite each other's outputs.
+
+    Returns:
+        list: (image path, output directory) pairs in natural order, without duplicates.
+    """
+    jobs = []
+    seen = set()
+
+    def add(path, target_dir):
+        resolved = path.resolve()
+        if resolved not in seen:
+            seen.add(resolved)
+            jobs.append((path, target_dir))
+
+    for pattern in patterns:
+        path = pathlib.Path(pattern)
+        if path.is_dir():
+            for img_path in list_images(path, recursive):
+                add(img_path, pathlib.Path(output_dir, img_path.parent.relative_to(path)))
+        elif path.is_file():
+            add(path, pathlib.Path(output_dir))
+        else:
+            matches = sorted(glob.glob(pattern, recursive=recursive), key=natural_sort_key)
+            for match in matches:
+                match = pathlib.Path(match)
+                if match.is_file() and match.suffix.lower() in IMAGE_EXTENSIONS:
+                    add(match, pathlib.Path(output_dir))
+    return jobs
+
+def pdf_output_path(img_path, output_dir):
+    """Path that write_pdf() uses for an image."""
+    return pathlib.Path(output_dir, f"{pathlib.Path(img_path).stem}.pdf")
+
+class ProgressPrinter:
+    """Prints batch progress to stdout, as JSON lines ('json') or human readable lines ('text'). Thread-safe."""
+    def __init__(self, style='json', total=0):
+        self.style = style
+        self.total = total
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def event(self, event, count=True, **fields):
+        with self._lock:
+            if count:
+                self.completed += 1
+            record = {'event': event, 'completed': self.completed, 'total': self.total, **fields}
+            if self.style == 'json':
+                print(json.dumps(record, default=str), flush=True)
+            elif self.style == 'text':
+                details = ' '.join(f"{k}={v}" for k, v in fields.items())
+                print(f"[{self.completed}/{self.total}] {event} {details}", flush=True)
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog="img2pdf",
+        description="Convert images to searchable PDFs with EasyOCR, without the GUI.",
+        epilog="Exit status: 0 if every image was converted (or skipped), 1 if any failed, 2 on usage errors, 130 if interrupted.")
+    parser.add_argument("inputs", nargs="+", help="Image files, directories or glob patterns")
+    parser.add_argument("-o", "--output", default="./output", help="Output directory (default: ./output)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Search directories recursively and let ** in globs match sub-directories")
+    parser.add_argument("-j", "--workers", type=int, default=None, help=f"Number of workers (default: {default_worker_count()})")
+    parser.add_argument("--processes", action="store_true", help="Use worker processes instead of threads (loads the models once per process)")
+    parser.add_argument("--batch-size", type=int, default=1, help="Pages per OCR inference batch across workers (default: 1, no batching)")
+    parser.add_argument("--batch-latency", type=float, default=0.05, help="Seconds a page may wait for a batch to fill (default: 0.05)")
+    parser.add_argument("--combine", metavar="NAME.pdf", help="Write all images, in order, into a single multi-page PDF in the output directory")
+    parser.add_argument("--overlay", action="store_true", help="Also save the *_detect detection overlay images")
+    parser.add_argument("--export", choices=sorted(EXPORT_FORMATS), action="append", default=[], help="Also write the OCR results as hOCR, ALTO XML or JSON lines (repeatable)")
+    parser.add_argument("--export-to", metavar="PREFIX", help="Stream the exports into rolling files PREFIX-00001.<ext>, ... instead of one file per image")
+    parser.add_argument("--export-max-mb", type=int, default=256, help="Size at which a rolling export file is closed and the next one started (default: %(default)s)")
+    parser.add_argument("--skip-existing", action="store_true", help="Skip images whose PDF already exists")
+    parser.add_argument("--resume", action="store_true", help=f"Skip images that the job manifest ({MANIFEST_NAME} in the output directory) records as converted, unchanged and with the same outputs and settings; failed and interrupted ones are retried")
+    parser.add_argument("--cache", metavar="PATH", nargs="?", const=DEFAULT_CACHE_PATH, help=f"Cache OCR results in PATH (default when given without a path: {DEFAULT_CACHE_PATH})")
+    parser.add_argument("--detection", choices=DETECTION_MODES, default="full", help="Detection strategy for large scans (default: %(default)s)")
+    parser.add_argument("--detect-max-side", type=int, default=2560, help="Longest side seen by detection in 'downscale' mode (default: %(default)s)")
+    parser.add_argument("--tile-size", type=int, default=2048, help="Detection tile size in 'tile' mode (default: %(default)s)")
+    parser.add_argument("--tile-overlap", type=int, default=128, help="Overlap between detection tiles (default: %(default)s)")
+    parser.add_argument("--max-detect-pixels", type=int, default=16_000_000, help="Largest image detected untiled in 'auto' mode (default: %(default)s)")
+    parser.add_argument("--adaptive", action="store_true", help="Fast first OCR pass, then re-recognize only low-confidence boxes with beam search")
+    parser.add_argument("--adaptive-threshold", type=float, default=0.5, help="Confidence below which --adaptive re-recognizes a box (default: %(default)s)")
+    parser.add_argument("--adaptive-canvas", type=int, default=1280, help="Detection resolution of the --adaptive first pass (default: %(default)s)")
+    parser.add_argument("--blank", choices=BLANK_POLICIES, help="Detect blank pages before OCR and drop them or write them without text (default: off)")
+    parser.add_argument("--blank-ink", type=float, default=0.0001, help="Ink coverage below which a page is blank (default: %(default)s)")
+    parser.add_argument("--duplicates", choices=DUPLICATE_POLICIES, help="Detect near-duplicate pages before OCR and drop them, write them without text or reuse the earlier page's text (default: off)")
+    parser.add_argument("--duplicate-distance", type=int, default=32, help="Differing hash bits (of 256) still counted as a duplicate, before the pages are compared pixel by pixel (default: %(default)s)")
+    parser.add_argument("--prefetch", type=int, default=2, help="Images decoded ahead of OCR (default: %(default)s, 0 disables)")
+    parser.add_argument("--no-mmap", action="store_true", help="Decode uncompressed TIFF/PPM inputs instead of memory-mapping them")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Report each file written on stderr")
+    parser.add_argument("--timings", action="store_true", help="Include per-stage timings, box counts and image size in the progress events")
+    parser.add_argument("--profile", metavar="DIR", help="Save a cProfile capture (.prof) per file in DIR; with worker threads, profiled files are processed one at a time")
+    parser.add_argument("--profile-match", metavar="PATTERN", default="*", help="Only profile files whose name matches PATTERN (default: all)")
+    parser.add_argument("--compression", choices=sorted(COMPRESSION_PROFILES), help="Downsample and re-encode the page images: archival (lossless), standard (300 DPI JPEG) or small (150 DPI, bilevel text scans). Default: embed them as decoded")
+    parser.add_argument("--languages", default=",".join(DEFAULT_LANGUAGES), help="Comma separated EasyOCR language codes (default: %(default)s)")
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR, help="EasyOCR model directory (default: %(default)s)")
+    parser.add_argument("--cpu", action="store_true", help="Do not use the GPU")
+    parser.add_argument("--progress", choices=("json", "text", "none"), default="json", help="Progress output on stdout (default: json lines)")
+    return parser
+
+def main(argv=None):
+    """Command-line batch entry point. Returns the process exit status."""
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    output_dir = pathlib.Path(args.output)
+    jobs = discover_inputs(args.inputs, output_dir, args.recursive)
+    if not jobs:
+        print("Error: No images found for the given inputs.", file=sys.stderr)
+        return 2
+
+    outputs = (('pdf', 'overlay') if args.overlay else ('pdf',)) + tuple(dict.fromkeys(args.export))
+    options = PipelineOptions(outputs=outputs, languages=[lang.strip() for lang in args.languages.split(',') if lang.strip()],
+                              model_dir=args.model_dir, gpu=not args.cpu, batch_size=args.batch_size,
+                              batch_latency=args.batch_latency, cache_path=args.cache,
+                              detection=args.detection, detect_max_side=args.detect_max_side, tile_size=args.tile_size,
+                              tile_overlap=args.tile_overlap, max_detect_pixels=args.max_detect_pixels,
+                              memory_map=not args.no_mmap, prefetch=args.prefetch, instrument=args.timings,
+                              profile_dir=args.profile, profile_pattern=args.profile_match,
+                              compression=args.compression, export_path=args.export_to,
+                              export_max_bytes=args.export_max_mb * 1024 * 1024, adaptive=args.adaptive,
+                              adaptive_threshold=args.adaptive_threshold, adaptive_canvas_size=args.adaptive_canvas,
+                              blank_policy=args.blank, blank_ink=args.blank_ink, duplicate_policy=args.duplicates,
+                              duplicate_distance=args.duplicate_distance, verbose=args.verbose)
+    progress = ProgressPrinter(args.progress, total=len(jobs))
+    started = time.perf_counter()
+
+    if args.combine:
+        return _main_combine(args, jobs, output_dir, options, progress, started)
+
+    counts = {'done': 0, 'error': 0, 'skipped': 0, 'cancelled': 0}
+    counts_lock = threading.Lock()
+
+    def finished(status, img_path, **fields):
+        with counts_lock:
+            counts[status] += 1
+        progress.event(status, input=img_path, **fields)
+
+    # Every batch is recorded in the manifest, so that an interrupted run can be picked up with --resume
+    manifest = JobManifest(output_dir / MANIFEST_NAME)
+    manifest.add(img_path for img_path, _ in jobs)
+
+    pending = []
+    for img_path, target_dir in jobs:
+        pdf_path = pdf_output_path(img_path, target_dir)
+        if args.skip_existing and pdf_path.exists():
+            finished('skipped', img_path, output=pdf_path)
+        elif args.resume and manifest.is_finished(img_path, options):
+            finished('skipped', img_path, output=pdf_path, reason='manifest')
+        else:
+            pending.append((img_path, target_dir))
+
+    def record(update, img_path, *args):
+        # The file's own status is reported regardless; a manifest that cannot be written only costs resumability
+        try:
+            update(img_path, *args)
+        except Exception as e:
+            print(f"Warning: Could not record {img_path} in the job manifest: {type(e).__name__}: {e}", file=sys.stderr)
+
+    def on_done(future, img_path):
+        if future.cancelled():
+            finished('cancelled', img_path)
+        elif future.exception() is not None:
+            error = f"{type(future.exception()).__name__}: {future.exception()}"
+            record(manifest.fail, img_path, error)
+            finished('error', img_path, error=error)
+        else:
+            result = future.result()
+            record(manifest.finish, img_path, result, options)
+            if result.get('screen', {}).get('policy') == 'drop':
+                finished('skipped', img_path, **result['screen'])
+                return
+            extra = {key: result[key] for key in ('screen', 'timings', 'profile') if key in result}
+            finished('done', img_path, outputs=result['outputs'], seconds=round(result['seconds'], 3), **extra)
+
+    mode = 'process' if args.processes else 'thread'
+    scheduler = BatchScheduler(max_workers=args.workers, mode=mode, options=options)
+    try:
+        for img_path, target_dir in pending:
+            target_dir.mkdir(parents=True, exist_ok=True)
+            manifest.start(img_path)
+            if scheduler.submit_image(str(img_path), str(target_dir), options,
+                                      callback=lambda future, img_path=img_path: on_done(future, img_path)) is None:
+                break
+        scheduler.shutdown(wait=True)
+    except KeyboardInterrupt:
+        scheduler.cancel()
+        scheduler.shutdown(wait=True)
+        manifest.close()
+        close_export_sinks()
+        progress.event('interrupted', count=False, **counts)
+        return 130
+
+    manifest.close()
+    close_export_sinks()
+    progress.event('finished', count=False, seconds=round(time.perf_counter() - started, 3), **counts)
+    return 1 if counts['error'] else 0
+
+def _main_combine(args, jobs, output_dir, options, progress, started):
+    output_dir.mkdir(parents=True, exist_ok=True)
+    pdf_path = output_dir / args.combine
+    if pdf_path.exists() and args.skip_existing:
+        progress.event('skipped', output=pdf_path)
+        return 0
+    try:
+        images_to_pdf([img_path for img_path, _ in jobs], pdf_path, options,
+                      progress=lambda img_path, page_number, **fields: progress.event('skipped' if page_number is None else 'page',
+                                                                                       input=img_path, page=page_number, **fields))
+    except KeyboardInterrupt:
+        progress.event('interrupted', count=False)
+        return 130
+    except Exception as e:
+        progress.event('error', count=False, output=pdf_path, error=f"{type(e).__name__}: {e}")
+        return 1
+    finally:
+        close_export_sinks()
+    progress.event('finished', count=False, output=pdf_path, seconds=round(time.perf_counter() - started, 3))
+    return 0
 
-# ... (rest of the code, including if __name__ == '__main__': block) ...
\ No newline at end of file
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,332 @@
+import argparse
+import json
+import os
+import pathlib
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = pathlib.Path(__file__).resolve().parent
+
+# Run in a fresh interpreter each time, so nothing is already imported or cached in memory
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+def time_import(module, directory, repeat=5):
+    """
+    Imports a module from a directory in `repeat` fresh interpreters.
+
+    Returns:
+        list of float: Import time in seconds for each run.
+    """
+    timings = []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+                                   cwd=directory, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {module} from {directory} failed:\n{completed.stderr.strip()}")
+        timings.append(float(completed.stdout.strip().splitlines()[-1])) # Older versions print on import
+    return timings
+
+def summarize(timings):
+    return {
+        "runs": len(timings),
+        "min_s": round(min(timings), 4),
+        "median_s": round(statistics.median(timings), 4),
+        "max_s": round(max(timings), 4),
+    }
+
+def export_revision(rev, directory):
+    """Writes img2pdf.py as of a git revision into directory, to compare against the working tree."""
+    source = subprocess.run(["git", "show", f"{rev}:img2pdf.py"], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout
+    pathlib.Path(directory, "img2pdf.py").write_text(source, encoding="utf-8")
+
+def bench_import(repeat=5, rev=None, module="img2pdf"):
+    """
+    Measures how long importing the module takes in the working tree and, optionally, at a git revision.
+
+    Returns:
+        dict: Timing summaries keyed by 'working tree' and the revision.
+    """
+    results = {"benchmark": "import", "module": module, "python": sys.version.split()[0]}
+    try:
+        results["working tree"] = summarize(time_import(module, REPO_DIR, repeat))
+    except RuntimeError as e:
+        results["working tree"] = {"error": str(e)}
+
+    if rev:
+        with tempfile.TemporaryDirectory() as directory:
+            export_revision(rev, directory)
+            try:
+                results[rev] = summarize(time_import("img2pdf", directory, repeat))
+            except RuntimeError as e:
+                results[rev] = {"error": str(e)}
+    return results
+
+WORDS = ("faktura", "belopp", "datum", "kund", "invoice", "amount", "total", "order", "leverans", "adress",
+         "Stockholm", "Göteborg", "Malmö", "moms", "summa", "account", "payment", "reference", "0123", "4567")
+
+def make_synthetic_pages(directory, count=10, size=(1240, 1754), seed=0, image_format="JPEG", rotated_every=3):
+    """
+    Generates text pages offline with PIL, so runs are reproducible without a scan corpus.
+    Every `rotated_every`-th page is stored sideways with an EXIF orientation tag, to exercise EXIF handling.
+
+    Returns:
+        list of pathlib.Path: The generated image files.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    rng = random.Random(seed)
+    try:
+        font = ImageFont.load_default(size=28)
+    except TypeError: # Pillow < 10.1 has a single fixed-size default font
+        font = ImageFont.load_default()
+
+    extension = {"JPEG": ".jpg", "PNG": ".png", "TIFF": ".tif"}[image_format]
+    paths = []
+    for index in range(count):
+        image = Image.new("RGB", size, "white")
+        draw = ImageDraw.Draw(image)
+        margin = size[0] // 12
+        y = margin
+        while y < size[1] - margin:
+            words = [rng.choice(WORDS) for _ in range(rng.randint(3, 9))]
+            draw.text((margin, y), " ".join(words), fill="black", font=font)
+            y += rng.randint(40, 70)
+
+        path = pathlib.Path(directory, f"page_{index:04d}{extension}")
+        if rotated_every and index % rotated_every == rotated_every - 1:
+            exif = image.getexif()
+            exif[0x0112] = 6 # Stored sideways, viewers rotate it back
+            image.transpose(Image.ROTATE_90).save(path, image_format, exif=exif)
+        else:
+            image.save(path, image_format)
+        paths.append(path)
+    return paths
+
+def summarize_stage(timings):
+    timings = sorted(timings)
+    return {
+        "count": len(timings),
+        "total_s": round(sum(timings), 4),
+        "mean_s": round(statistics.mean(timings), 5),
+        "median_s": round(statistics.median(timings), 5),
+        "p95_s": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 5),
+    }
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its waited-for children, in MiB."""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024 # ru_maxrss is bytes on macOS, KiB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) * scale / (1024 * 1024), 1)
+
+def bench_stages(paths, output_dir, options, ocr=True):
+    """
+    Runs the pipeline stages one after another on each image and times them separately:
+    decode, exif, detection, recognition, pdf_write and overlay_render (plus a one-off model_load).
+
+    Returns:
+        dict: Per-stage timing summaries and output sizes.
+    """
+    import PIL.ImageOps
+    from PIL import Image
+    import numpy as np
+    import img2pdf
+
+    stages = {name: [] for name in ("decode", "exif", "detection", "recognition", "pdf_write", "overlay_render")}
+    results = {}
+    reader = None
+    if ocr:
+        started = time.perf_counter()
+        reader = options.get_reader()
+        results["model_load_s"] = round(time.perf_counter() - started, 3)
+
+    pdf_bytes = []
+    boxes = []
+    for path in paths:
+        # Mirrors load_image(), split into its two stages
+        started = time.perf_counter()
+        image = Image.open(path)
+        source_format = image.format
+        image.load()
+        stages["decode"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        transformed = False
+        if image.getexif().get(0x0112, 1) not in (None, 1):
+            image = PIL.ImageOps.exif_transpose(image)
+            transformed = True
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+            transformed = True
+        stages["exif"].append(time.perf_counter() - started)
+
+        page = img2pdf.OcrPage(str(path), image, [], source_format, transformed)
+        if ocr:
+            started = time.perf_counter()
+            horizontal_list, free_list = reader.detect(page.pixels)
+            stages["detection"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            grey = page.pixels if page.pixels.ndim == 2 else np.asarray(page.image.convert("L"))
+            page.results = reader.recognize(grey, horizontal_list=horizontal_list[0], free_list=free_list[0])
+            stages["recognition"].append(time.perf_counter() - started)
+            boxes.append(len(page.results))
+
+        started = time.perf_counter()
+        pdf_path = img2pdf.write_pdf(page, str(output_dir), options)
+        stages["pdf_write"].append(time.perf_counter() - started)
+        pdf_bytes.append(os.path.getsize(pdf_path))
+
+        started = time.perf_counter()
+        img2pdf.write_overlay(page, str(output_dir), options)
+        stages["overlay_render"].append(time.perf_counter() - started)
+        page.release()
+
+    results["stages"] = {name: summarize_stage(timings) for name, timings in stages.items() if timings}
+    results["pdf_bytes"] = {"total": sum(pdf_bytes), "mean": round(statistics.mean(pdf_bytes))}
+    if boxes:
+        results["boxes_per_page"] = round(statistics.mean(boxes), 1)
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+def bench_throughput(paths, output_dir, options, workers, mode="thread"):
+    """
+    Converts every image with a BatchScheduler of the given size and measures pages per second.
+    Run it in a fresh process (see the 'throughput' command) so the peak RSS belongs to this run alone.
+    """
+    import img2pdf
+
+    started = time.perf_counter()
+    with img2pdf.BatchScheduler(max_workers=workers, mode=mode, options=options) as scheduler:
+        futures = [scheduler.submit_image(str(path), str(output_dir), options) for path in paths]
+    seconds = time.perf_counter() - started
+    errors = [str(future.exception()) for future in futures if future.exception() is not None]
+    pdf_bytes = sum(os.path.getsize(p) for p in pathlib.Path(output_dir).glob("*.pdf"))
+    return {
+        "workers": workers,
+        "mode": mode,
+        "pages": len(paths),
+        "seconds": round(seconds, 3),
+        "pages_per_s": round(len(paths) / seconds, 3) if seconds else None,
+        "pdf_bytes": pdf_bytes,
+        "peak_rss_mb": peak_rss_mb(),
+        "errors": errors[:5],
+    }
+
+def bench_pipeline(args):
+    """Runs the per-stage benchmark in this process, then each worker count in a fresh process."""
+    import img2pdf
+
+    options = img2pdf.PipelineOptions(outputs=("pdf",), model_dir=args.model_dir, gpu=not args.cpu)
+    results = {
+        "benchmark": "pipeline",
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "settings": {"pages": args.pages, "size": args.size, "format": args.format, "seed": args.seed, "ocr": not args.no_ocr},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        image_dir = pathlib.Path(args.images or pathlib.Path(tmp, "images"))
+        image_dir.mkdir(parents=True, exist_ok=True)
+        width, height = (int(v) for v in args.size.split("x"))
+        paths = make_synthetic_pages(image_dir, args.pages, (width, height), args.seed, args.format)
+
+        stage_dir = pathlib.Path(tmp, "stages")
+        stage_dir.mkdir()
+        results.update(bench_stages(paths, stage_dir, options, ocr=not args.no_ocr))
+
+        if not args.no_ocr:
+            results["throughput"] = []
+            for workers in args.workers:
+                command = [sys.executable, str(pathlib.Path(__file__).resolve()), "throughput", str(image_dir),
+                           "--workers", str(workers), "--mode", args.mode, "--model-dir", args.model_dir]
+                if args.cpu:
+                    command.append("--cpu")
+                completed = subprocess.run(command, cwd=REPO_DIR, capture_output=True, text=True)
+                if completed.returncode != 0:
+                    results["throughput"].append({"workers": workers, "error": completed.stderr.strip()[-2000:]})
+                else:
+                    results["throughput"].append(json.loads(completed.stdout))
+    return results
+
+def compare_results(before_path, after_path):
+    """Relative change of every stage's mean time and of throughput between two saved pipeline runs."""
+    before = json.loads(pathlib.Path(before_path).read_text(encoding="utf-8"))
+    after = json.loads(pathlib.Path(after_path).read_text(encoding="utf-8"))
+
+    def change(old, new):
+        return None if not old else round((new - old) / old * 100, 1)
+
+    comparison = {"benchmark": "compare", "before": str(before_path), "after": str(after_path), "stages_mean_pct": {}}
+    for name, stage in after.get("stages", {}).items():
+        if name in before.get("stages", {}):
+            comparison["stages_mean_pct"][name] = change(before["stages"][name]["mean_s"], stage["mean_s"])
+    if "pdf_bytes" in before and "pdf_bytes" in after:
+        comparison["pdf_bytes_pct"] = change(before["pdf_bytes"]["total"], after["pdf_bytes"]["total"])
+    if "peak_rss_mb" in before and "peak_rss_mb" in after:
+        comparison["peak_rss_pct"] = change(before["peak_rss_mb"], after["peak_rss_mb"])
+    old_rates = {run["workers"]: run.get("pages_per_s") for run in before.get("throughput", [])}
+    comparison["pages_per_s_pct"] = {run["workers"]: change(old_rates.get(run["workers"]), run.get("pages_per_s") or 0)
+                                     for run in after.get("throughput", []) if run["workers"] in old_rates}
+    return comparison
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="img2pdf_bench", description="Benchmarks for img2pdf.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Measure module import (startup) time")
+    import_parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters to time (default: %(default)s)")
+    import_parser.add_argument("--rev", help="Also time img2pdf.py as of this git revision, e.g. a commit from before a change")
+    import_parser.add_argument("--module", default="img2pdf", choices=("img2pdf", "img2pdf_gui"), help="Module to import (default: %(default)s)")
+    import_parser.add_argument("--json", metavar="PATH", help="Also save the results as JSON")
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="Time each conversion stage and measure throughput on synthetic pages")
+    pipeline_parser.add_argument("--pages", type=int, default=10, help="Synthetic pages to generate (default: %(default)s)")
+    pipeline_parser.add_argument("--size", default="1240x1754", help="Page size in pixels, WIDTHxHEIGHT (default: %(default)s, A4 at 150 dpi)")
+    pipeline_parser.add_argument("--format", default="JPEG", choices=("JPEG", "PNG", "TIFF"), help="Image format of the pages (default: %(default)s)")
+    pipeline_parser.add_argument("--seed", type=int, default=0, help="Random seed for the page text (default: %(default)s)")
+    pipeline_parser.add_argument("--images", metavar="DIR", help="Keep the generated pages in DIR instead of a temporary directory")
+    pipeline_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to measure throughput at (default: 1 2 4)")
+    pipeline_parser.add_argument("--mode", choices=("thread", "process"), default="thread", help="Scheduler mode for the throughput runs")
+    pipeline_parser.add_argument("--no-ocr", action="store_true", help="Skip detection, recognition and throughput; time decoding and writing only")
+    pipeline_parser.add_argument("--model-dir", default="./model", help="EasyOCR model directory (default: %(default)s)")
+    pipeline_parser.add_argument("--cpu", action="store_true", help="Do not use the GPU")
+    pipeline_parser.add_argument("--json", metavar="PATH", help="Also save the results as JSON")
+
+    throughput_parser = subparsers.add_parser("throughput", help="Convert a directory of images once and report pages per second")
+    throughput_parser.add_argument("images", help="Directory of images")
+    throughput_parser.add_argument("--workers", type=int, default=1)
+    throughput_parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    throughput_parser.add_argument("--model-dir", default="./model")
+    throughput_parser.add_argument("--cpu", action="store_true")
+    throughput_parser.add_argument("--json", metavar="PATH", help="Also save the results as JSON")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two saved pipeline results")
+    compare_parser.add_argument("before", help="JSON from the earlier run")
+    compare_parser.add_argument("after", help="JSON from the later run")
+    compare_parser.add_argument("--json", metavar="PATH", help="Also save the comparison as JSON")
+
+    args = parser.parse_args(argv)
+    if args.command == "import":
+        results = bench_import(args.repeat, args.rev, args.module)
+    elif args.command == "pipeline":
+        results = bench_pipeline(args)
+    elif args.command == "throughput":
+        import img2pdf
+        options = img2pdf.PipelineOptions(outputs=("pdf",), model_dir=args.model_dir, gpu=not args.cpu)
+        with tempfile.TemporaryDirectory() as output_dir:
+            results = bench_throughput(img2pdf.list_images(args.images), output_dir, options, args.workers, args.mode)
+    else:
+        results = compare_results(args.before, args.after)
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
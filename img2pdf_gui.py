@@ -3,19 +3,178 @@ from tkinter import ttk, filedialog, messagebox
 import pathlib
 import time
 import traceback
-from img2pdf import img_to_pdf, draw_bounds_before_process
-import threading
-import queue
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-import pathlib
-import time
-import traceback
-from img2pdf import img_to_pdf, draw_bounds_before_process
+from img2pdf import PipelineOptions, BatchScheduler, JobManifest, default_worker_count, warm_up_readers, list_images, page_hashes, DEFAULT_CACHE_PATH, MANIFEST_NAME, BLANK_POLICIES, DUPLICATE_POLICIES
 import threading
 import queue
+import itertools
+import os
+import argparse
+import atexit
+import sys
 import json # Import the json module
 
+# Bounds on the work done per UI tick, so that huge batches never freeze the window
+SCAN_BATCH_SIZE = 500 # Files a scanner thread stats before handing them to the UI thread
+MAX_ROWS_PER_TICK = 5000 # Scanned files added to the input list per tick
+MAX_EVENTS_PER_TICK = 1000 # Finished jobs applied to the lists and progress bar per tick
+
+class VirtualList(ttk.Frame):
+    """
+    A Treeview that shows tens of thousands of rows without slowing down the UI.
+
+    The rows live in a dict (key -> values) and the Treeview only holds the handful of rows that fit on
+    screen, which are refilled from the dict when the list scrolls or changes. Changes are coalesced:
+    any number of insert_many()/delete_many() calls cause a single redraw when Tk is next idle.
+    """
+    def __init__(self, parent, columns, **kwargs):
+        super().__init__(parent)
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="extended", **kwargs)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill="y")
+        self.tree.pack(side=tk.LEFT, expand=True, fill="both")
+
+        self._rows = {} # Insertion ordered
+        self._order = [] # self._rows keys, rebuilt lazily after deletions
+        self._order_stale = False
+        self._selected = set()
+        self._top = 0 # Index of the first visible row
+        self._visible = 20 # Rows that fit in the widget, updated on resize
+        self._redraw_pending = False
+        self._window = [] # Keys of the rows currently in the Treeview
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        # The Treeview never scrolls itself, it always shows exactly the rows of the window
+        self.tree.bind("<MouseWheel>", lambda e: self._on_wheel(-1 if e.delta > 0 else 1))
+        self.tree.bind("<Button-4>", lambda e: self._on_wheel(-1))
+        self.tree.bind("<Button-5>", lambda e: self._on_wheel(1))
+
+    def heading(self, column, **kwargs):
+        return self.tree.heading(column, **kwargs)
+
+    def column(self, column, **kwargs):
+        return self.tree.column(column, **kwargs)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def keys(self):
+        """Row keys in display order."""
+        if self._order_stale:
+            self._order = list(self._rows)
+            self._order_stale = False
+        return self._order
+
+    def get(self, key, default=None):
+        """Values of a row, or default if it was deleted."""
+        return self._rows.get(key, default)
+
+    def insert_many(self, rows):
+        """Appends (key, values) rows."""
+        for key, values in rows:
+            if key not in self._rows:
+                self._rows[key] = values
+                if not self._order_stale:
+                    self._order.append(key)
+        self.refresh()
+
+    def delete_many(self, keys):
+        for key in keys:
+            if self._rows.pop(key, None) is not None:
+                self._selected.discard(key)
+                self._order_stale = True
+        self.refresh()
+
+    def clear(self):
+        self._rows.clear()
+        self._order = []
+        self._order_stale = False
+        self._selected.clear()
+        self._top = 0
+        self.refresh()
+
+    def selection(self):
+        """Keys of the selected rows, including rows scrolled out of view."""
+        return [key for key in self.keys() if key in self._selected]
+
+    def key_at(self, y):
+        """Key of the row at widget y coordinate y, or None."""
+        item = self.tree.identify_row(y)
+        return self._key_of_item(item) if item else None
+
+    def select(self, key):
+        self._selected = {key}
+        self.refresh()
+
+    def scroll(self, amount, what):
+        step = self._visible - 1 if what == "pages" else 1
+        self._scroll_to(self._top + int(amount) * max(1, step))
+
+    def refresh(self):
+        """Schedules a redraw for when Tk is idle; further calls before then are free."""
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self._redraw)
+
+    def _scroll_to(self, top):
+        top = max(0, min(top, len(self._rows) - self._visible))
+        if top != self._top:
+            self._top = top
+            self.refresh()
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self._scroll_to(round(float(args[0]) * len(self._rows)))
+        elif action == "scroll":
+            self.scroll(args[0], args[1])
+
+    def _on_wheel(self, direction):
+        self.scroll(direction * 3, "units")
+        return "break"
+
+    def _on_resize(self, event):
+        row_height = ttk.Style().lookup("Treeview", "rowheight") or 20
+        visible = max(1, event.height // int(row_height) - 1) # Minus the heading row
+        if visible != self._visible:
+            self._visible = visible
+            self.refresh()
+
+    def _key_of_item(self, item):
+        index = self.tree.index(item)
+        return self._window[index] if index < len(self._window) else None
+
+    def _on_select(self, event):
+        # Only the visible rows can change selection; rows scrolled out of view keep theirs
+        selected_items = set(self.tree.selection())
+        for item, key in zip(self.tree.get_children(), self._window):
+            if item in selected_items:
+                self._selected.add(key)
+            else:
+                self._selected.discard(key)
+
+    def _redraw(self):
+        self._redraw_pending = False
+        keys = self.keys()
+        self._top = max(0, min(self._top, len(keys) - self._visible))
+        window = self._window = keys[self._top:self._top + self._visible]
+
+        # Reuse the existing Treeview items, only their values change
+        items = list(self.tree.get_children())
+        if len(items) > len(window):
+            self.tree.delete(*items[len(window):])
+            items = items[:len(window)]
+        while len(items) < len(window):
+            items.append(self.tree.insert("", "end"))
+        for item, key in zip(items, window):
+            self.tree.item(item, values=self._rows[key])
+        self.tree.selection_set([item for item, key in zip(items, window) if key in self._selected])
+
+        if keys:
+            self.scrollbar.set(self._top / len(keys), min(1.0, (self._top + len(window)) / len(keys)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+
 class Img2PdfGUI:
     def __init__(self, root):
         self.root = root
@@ -63,6 +222,15 @@ class Img2PdfGUI:
 
         self.processing_queue = queue.Queue()
         self.files_processed = 0
+        self.files_completed = 0 # Processed, failed or cancelled
+        self.scheduler = None
+        self.manifest = None # JobManifest of the running batch
+        self.feed_queue = None # Files waiting to be submitted to the running batch
+        self.resume = False # Whether the next batch skips files the manifest records as converted (see offer_resume)
+        self.files_total = 0
+        self.scan_queue = queue.Queue() # Batches of (path, name, size) from the scanner threads
+        self.scans_running = 0
+        self.row_keys = itertools.count() # Keys of the input list rows, also used as job ids
 
     def assign_tab_ids(self):
         """Assigns id_str to notebook tabs after they are created."""
@@ -118,11 +286,22 @@ class Img2PdfGUI:
         self.input_list.heading("File name", text=self.get_translation("table_input_files.col_file_name"))
         self.input_list.heading("Size", text=self.get_translation("table_input_files.col_file_size"))
         self.browse_button.config(text=self.get_translation("table_input_files.btn_browse"))
+        self.browse_dir_button.config(text=self.get_translation("table_input_files.btn_browse_dir"))
         self.clear_button.config(text=self.get_translation("table_input_files.btn_clear"))
         self.output_frame.config(text=self.get_translation("table_output_files.lbl_title"))
         self.output_list.heading("File name", text=self.get_translation("table_output_files.col_file_name"))
         self.output_list.heading("Size", text=self.get_translation("table_output_files.col_file_size"))
         self.output_button.config(text=self.get_translation("table_output_files.btn_choose_dir"))
+        self.overlay_check.config(text=self.get_translation("table_output_files.chk_overlay"))
+        self.workers_label.config(text=self.get_translation("table_output_files.lbl_workers"))
+        self.processes_check.config(text=self.get_translation("table_output_files.chk_processes"))
+        for label, combo, choices in ((self.blank_label, self.blank_combo, self.blank_choices),
+                                      (self.duplicate_label, self.duplicate_combo, self.duplicate_choices)):
+            label.config(text=self.get_translation(label.id_str))
+            selected = combo.current()
+            combo.config(values=self.policy_names(choices))
+            combo.current(selected)
+        self.cancel_button.config(text=self.get_translation("btn_cancel"))
         self.arrow_button.config(text=self.get_translation("btn_process")) # Assuming you want to translate the arrow button text too
 
         # Help Tab elements (if any translatable text is added there later)
@@ -137,18 +316,16 @@ class Img2PdfGUI:
         self.input_frame.pack(side=tk.LEFT, fill="both", expand=True, padx=5, pady=5)
         self.input_frame.id_str = "table_input_files.lbl_title" # Assign ID
 
-        self.input_list = ttk.Treeview(self.input_frame, columns=("Path", "File name", "Size", "Item ID", "Delete"), show="headings")
+        self.input_list = VirtualList(self.input_frame, columns=("Path", "File name", "Size", "Delete"))
         self.input_list.heading("Path", text=self.get_translation("table_input_files.col_file_path")) # Get translated heading
         self.input_list.heading("File name", text=self.get_translation("table_input_files.col_file_name")) # Get translated heading
         self.input_list.heading("Size", text=self.get_translation("table_input_files.col_file_size")) # Get translated heading
-        self.input_list.heading("Item ID", text="Item ID")
         self.input_list.heading("Delete", text="")
-        self.input_list.column("Item ID", width=0, stretch=tk.NO)
         self.input_list.column("Delete", width=30, anchor="center")
         self.input_list.pack(expand=True, fill="both", padx=5, pady=5)
-        self.input_list.tag_configure("hidden_id", foreground="#d9d9d9")
 
-        self.input_list.unbind("<<TreeviewSelect>>")
+        # One binding for the whole list: a click in the Delete column removes that row
+        self.input_list.tree.bind("<Button-1>", self.on_input_click)
 
         buttons_frame = ttk.Frame(self.input_frame)
         buttons_frame.pack(pady=5)
@@ -157,16 +334,27 @@ class Img2PdfGUI:
         self.browse_button.pack(side=tk.LEFT, padx=5)
         self.browse_button.id_str = "table_input_files.btn_browse" # Assign ID
 
+        self.browse_dir_button = ttk.Button(buttons_frame, text=self.get_translation("table_input_files.btn_browse_dir"), command=self.browse_directory)
+        self.browse_dir_button.pack(side=tk.LEFT, padx=5)
+        self.browse_dir_button.id_str = "table_input_files.btn_browse_dir" # Assign ID
+
         self.clear_button = ttk.Button(buttons_frame, text=self.get_translation("table_input_files.btn_clear"), command=self.clear_input_list) # Get translated text
         self.clear_button.pack(side=tk.LEFT, padx=5)
         self.clear_button.id_str = "table_input_files.btn_clear" # Assign ID
 
         # Right-click context menu for input list
-        self.input_list.bind("<Button-3>", self.show_input_context_menu)
+        self.input_list.tree.bind("<Button-3>", self.show_input_context_menu)
 
-        self.arrow_button = ttk.Button(self.process_frame, text=self.get_translation("btn_process"),  width=5, command=self.start_processing_threads) # Get translated text
-        self.arrow_button.pack(side=tk.LEFT, padx=20)
+        controls_frame = ttk.Frame(self.process_frame)
+        controls_frame.pack(side=tk.LEFT, padx=20)
+
+        self.arrow_button = ttk.Button(controls_frame, text=self.get_translation("btn_process"),  width=5, command=self.start_processing_threads) # Get translated text
+        self.arrow_button.pack(pady=5)
         self.arrow_button.id_str = "btn_process" # Assign ID
+
+        self.cancel_button = ttk.Button(controls_frame, text=self.get_translation("btn_cancel"), width=5, command=self.cancel_processing, state=tk.DISABLED)
+        self.cancel_button.pack(pady=5)
+        self.cancel_button.id_str = "btn_cancel" # Assign ID
         # Style for hover effect (using ttk.Style)
         style = ttk.Style()
         style.map("Arrow.TButton",
@@ -187,12 +375,54 @@ class Img2PdfGUI:
         self.output_button.pack()
         self.output_button.id_str = "table_output_files.btn_choose_dir" # Assign ID
 
-        self.output_list = ttk.Treeview(self.output_frame, columns=("File name", "Size"), show="headings")
+        # The detection overlay is a debugging aid, production runs can switch it off to skip rendering it
+        self.overlay_var = tk.BooleanVar(value=True)
+        self.overlay_check = ttk.Checkbutton(self.output_frame, text=self.get_translation("table_output_files.chk_overlay"), variable=self.overlay_var)
+        self.overlay_check.pack(pady=5)
+        self.overlay_check.id_str = "table_output_files.chk_overlay" # Assign ID
+
+        workers_frame = ttk.Frame(self.output_frame)
+        workers_frame.pack(pady=5)
+        self.workers_label = ttk.Label(workers_frame, text=self.get_translation("table_output_files.lbl_workers"))
+        self.workers_label.pack(side=tk.LEFT)
+        self.workers_label.id_str = "table_output_files.lbl_workers" # Assign ID
+        self.workers_var = tk.IntVar(value=default_worker_count())
+        self.workers_spinbox = ttk.Spinbox(workers_frame, from_=1, to=max(1, os.cpu_count() or 1), width=4, textvariable=self.workers_var)
+        self.workers_spinbox.pack(side=tk.LEFT, padx=5)
+
+        # Worker processes avoid GIL contention between decoding and OCR, but load the models once per process
+        self.processes_var = tk.BooleanVar(value=False)
+        self.processes_check = ttk.Checkbutton(self.output_frame, text=self.get_translation("table_output_files.chk_processes"), variable=self.processes_var)
+        self.processes_check.pack(pady=5)
+        self.processes_check.id_str = "table_output_files.chk_processes" # Assign ID
+
+        # Screening before OCR (see img2pdf.screen_page()): blank pages keep their image but skip OCR by default
+        self.blank_choices = (None,) + BLANK_POLICIES
+        self.blank_label, self.blank_combo = self.create_policy_choice("table_output_files.lbl_blank", self.blank_choices, 'image')
+        self.duplicate_choices = (None,) + DUPLICATE_POLICIES
+        self.duplicate_label, self.duplicate_combo = self.create_policy_choice("table_output_files.lbl_duplicates", self.duplicate_choices, None)
+
+        self.output_list = VirtualList(self.output_frame, columns=("File name", "Size"))
         self.output_list.heading("File name", text=self.get_translation("table_output_files.col_file_name")) # Get translated heading
         self.output_list.heading("Size", text=self.get_translation("table_output_files.col_file_size")) # Get translated heading
         self.output_list.pack(expand=True, fill="both", padx=5, pady=5)
 
 
+    def create_policy_choice(self, label_id, choices, default):
+        """A labelled drop-down of screening policies (None shown as 'keep'); returns the label and the combobox."""
+        frame = ttk.Frame(self.output_frame)
+        frame.pack(pady=2)
+        label = ttk.Label(frame, text=self.get_translation(label_id))
+        label.pack(side=tk.LEFT)
+        label.id_str = label_id # Assign ID
+        combo = ttk.Combobox(frame, state="readonly", width=14, values=self.policy_names(choices))
+        combo.current(choices.index(default))
+        combo.pack(side=tk.LEFT, padx=5)
+        return label, combo
+
+    def policy_names(self, choices):
+        return [self.get_translation(f"policy.{choice or 'off'}") for choice in choices]
+
     def create_help_tab(self):
         help_text_en = """
         Instructions:
@@ -215,11 +445,11 @@ class Img2PdfGUI:
             menu.add_command(label="Delete", command=self.delete_selected_input_items)
 
             # Get item clicked on (if any)
-            item = self.input_list.identify_row(event.y)
-            if item:
+            item = self.input_list.key_at(event.y)
+            if item is not None:
                 # Select the item if it's not already selected
                 if item not in self.input_list.selection():
-                    self.input_list.selection_set(item)
+                    self.input_list.select(item)
 
                 menu.tk_popup(event.x_root, event.y_root)
 
@@ -228,10 +458,8 @@ class Img2PdfGUI:
 
     def delete_selected_input_items(self):
         """Deletes the selected items from the input list."""
-        selected_items = self.input_list.selection()
-        for item in selected_items:
-            self.input_list.delete(item)
-        if not self.input_list.get_children():
+        self.input_list.delete_many(self.input_list.selection())
+        if not len(self.input_list):
             self.hide_progress()
 
     def browse_files(self):
@@ -239,37 +467,91 @@ class Img2PdfGUI:
             filetypes=[("Image Files", "*.png;*.jpg;*.jpeg")]
         )
         if file_paths:
-            for path in file_paths:
-                file_path = pathlib.Path(path)
-                file_size = file_path.stat().st_size
-                item_id = self.input_list.insert("", "end", values=(file_path, file_path.name, file_size, "", "")) # Added empty string for Item ID initially
-                self.input_list.set(item_id, "Item ID", item_id) # Set the actual item ID in the hidden column
-                # Create the delete button *after* inserting the item, and use a lambda
-                delete_button = ttk.Button(self.input_list, text="X", width=3,
-                                            command=lambda item=item_id: self.delete_input_item(item))
-                # Place the button in the "Delete" column of the Treeview
-                self.input_list.set(item_id, "Delete", "")
-                self.input_list.item(item_id, tags=("delete_button",))
-                # Bind to the delete button's tag
-                self.input_list.tag_bind("delete_button", "<Button-1>",
-                                          lambda e, item=item_id: self.on_delete_button_click(e, item))
-            self.show_progress()
-
-    def on_delete_button_click(self, event, item_id):
-        """Handles a click on the delete button within the Treeview."""
-        clicked_element = self.input_list.identify_element(event.x, event.y)
-        if "button" in clicked_element:
-             self.delete_input_item(item_id)
+            self.add_input_files(file_paths)
+
+    def browse_directory(self):
+        directory = filedialog.askdirectory()
+        if directory:
+            self.start_scan(lambda: list_images(directory, recursive=True))
+
+    def add_input_files(self, file_paths):
+        """Adds files to the input list. While a batch is running they are appended to it as well."""
+        file_paths = list(file_paths)
+        self.start_scan(lambda: file_paths)
+
+    def start_scan(self, list_paths):
+        """Lists and stats files on a background thread; poll_scan_queue() adds them to the input list in batches."""
+        self.scans_running += 1
+        threading.Thread(target=self.scan_files, args=(list_paths, self.scan_queue), daemon=True).start()
+        if self.scans_running == 1:
+            self.poll_scan_queue()
+
+    def scan_files(self, list_paths, scan_queue):
+        """Scanner thread: puts batches of (path, name, size) on scan_queue, then None once done."""
+        batch = []
+        try:
+            for path in list_paths():
+                path = pathlib.Path(path)
+                try:
+                    file_size = path.stat().st_size
+                except OSError as e:
+                    log(f"Skipping {path}: {e}", error=True)
+                    continue
+                batch.append((str(path), path.name, file_size))
+                if len(batch) >= SCAN_BATCH_SIZE:
+                    scan_queue.put(batch)
+                    batch = []
+        except Exception as e:
+            log(f"Error scanning input files: {e}", error=True, exc=e)
+        finally:
+            scan_queue.put(batch)
+            scan_queue.put(None)
+
+    def poll_scan_queue(self):
+        """Adds up to MAX_ROWS_PER_TICK scanned files to the input list per tick while scans are running."""
+        rows = []
+        try:
+            while len(rows) < MAX_ROWS_PER_TICK:
+                batch = self.scan_queue.get_nowait()
+                if batch is None:
+                    self.scans_running -= 1
+                else:
+                    rows.extend(batch)
+        except queue.Empty:
+            pass
+        if rows:
+            self.add_input_rows(rows)
+        if self.scans_running:
+            self.root.after(50, self.poll_scan_queue)
+
+    def add_input_rows(self, rows):
+        entries = [(next(self.row_keys), (path, name, file_size, "\u2716")) for path, name, file_size in rows]
+        self.input_list.insert_many(entries)
+        self.show_progress()
+
+        if self.scheduler is not None:
+            self.files_total += len(entries)
+            self.progress_bar["maximum"] = self.files_total
+            for item_id, values in entries:
+                self.feed_queue.put((item_id, values[0]))
+            log(f"Added {len(entries)} file(s) to the running batch")
+
+    def on_input_click(self, event):
+        """Handles a click on the delete button within the input list."""
+        if self.input_list.tree.identify_column(event.x) == "#4": # The Delete column
+            item_id = self.input_list.key_at(event.y)
+            if item_id is not None:
+                self.delete_input_item(item_id)
+                return "break"
 
     def delete_input_item(self, item_id):
         """Deletes a single item from the input list."""
-        self.input_list.delete(item_id)
-        if not self.input_list.get_children():
+        self.input_list.delete_many([item_id])
+        if not len(self.input_list):
             self.hide_progress()
 
     def clear_input_list(self):
-        for item in self.input_list.get_children():
-            self.input_list.delete(item)
+        self.input_list.clear()
         self.hide_progress()
 
     def choose_output_directory(self):
@@ -285,11 +567,25 @@ class Img2PdfGUI:
         self.progress_bar.pack_forget()
         self.progress_label.pack_forget()
 
-    def update_progress(self, value):
-        self.progress_bar["value"] = value
-        self.progress_label.config(text=f"{value}%")
-        self.root.update_idletasks()
+    def update_progress(self, completed):
+        """Shows the number of completed files; Tk redraws the bar once the UI thread is idle."""
+        self.progress_bar["value"] = completed
+        self.progress_label.config(text=f"{completed / max(1, self.files_total) * 100:.0f}%")
 
+    def offer_resume(self):
+        """Offers to re-add the files that an earlier, interrupted batch into the output directory did not finish."""
+        manifest_path = pathlib.Path(self.output_path_var.get()) / MANIFEST_NAME
+        if not manifest_path.exists():
+            return
+        manifest = JobManifest(manifest_path)
+        try:
+            unfinished = [path for path in manifest.unfinished() if os.path.exists(path)]
+        finally:
+            manifest.close()
+        if unfinished and messagebox.askyesno("Resume Batch", f"{len(unfinished)} image(s) from an earlier batch were not converted. Add them to the list?"):
+            log(f"Resuming {len(unfinished)} unfinished file(s) from {manifest_path}")
+            self.resume = True
+            self.add_input_files(unfinished)
 
     def start_processing_threads(self):
         output_dir = pathlib.Path(self.output_path_var.get())
@@ -297,119 +593,317 @@ class Img2PdfGUI:
             output_dir.mkdir(parents=True, exist_ok=True)
             log(f"Created output directory: {output_dir}")
 
-        total_files = len(self.input_list.get_children())
+        total_files = len(self.input_list)
         if total_files == 0:
             messagebox.showwarning("No Files", "Please select files to process.")
             return
 
+        self.files_total = total_files
         self.progress_bar["maximum"] = total_files
-        self.progress_bar["value"] = 0
         self.files_processed = 0
+        self.files_completed = 0
+        self.update_progress(0)
         self.show_progress()
 
-        log(f"Starting PDF conversion with threads. Total files: {total_files}")
+        outputs = ('pdf', 'overlay') if self.overlay_var.get() else ('pdf',)
+        options = PipelineOptions(outputs=outputs, cache_path=DEFAULT_CACHE_PATH, # Re-runs reuse earlier OCR results
+                                  instrument=True, # Per-stage timings for the log
+                                  blank_policy=self.blank_choices[self.blank_combo.current()],
+                                  duplicate_policy=self.duplicate_choices[self.duplicate_combo.current()])
+
+        try:
+            workers = max(1, int(self.workers_var.get()))
+        except (tk.TclError, ValueError):
+            workers = default_worker_count()
+        mode = 'process' if self.processes_var.get() else 'thread'
+
+        log(f"Starting PDF conversion with {workers} {mode} worker(s). Total files: {total_files}")
 
         self.processing_queue = queue.Queue() # Create a new queue for each batch
+        page_hashes.clear() # Duplicates are only looked for within a batch
+        self.scheduler = BatchScheduler(max_workers=workers, mode=mode, options=options)
+        # The manifest survives a crash or the window being closed, so that the batch can be resumed on the next start
+        self.manifest = JobManifest(output_dir / MANIFEST_NAME)
+        resume, self.resume = self.resume, False # Only the batch the resume prompt was accepted for skips finished files
+        self.feed_queue = queue.Queue()
         self.arrow_button.config(state=tk.DISABLED) # Disable process button
+        self.cancel_button.config(state=tk.NORMAL)
         self.root.config(cursor="wait") # Change cursor to wait
 
-        for item_id in self.input_list.get_children():
-            file_path = self.input_list.item(item_id)["values"][0]
-            log(f"Processing file [Threaded]: {file_path}")
+        for item_id in self.input_list.keys():
+            self.feed_queue.put((item_id, self.input_list.get(item_id)[0]))
 
-            thread = threading.Thread(target=self.process_image_thread, args=(file_path, output_dir, self.processing_queue, item_id)) # Pass item_id
-            thread.daemon = True
-            thread.start()
+        # submit() blocks while the scheduler's backlog is full, so feed it from a separate thread
+        feeder = threading.Thread(target=self.feed_scheduler,
+                                  args=(self.scheduler, self.manifest, self.feed_queue, output_dir, options, self.processing_queue, resume),
+                                  daemon=True)
+        feeder.start()
 
         self.check_processing_queue()
 
+    def feed_scheduler(self, scheduler, manifest, feed_queue, output_dir, options, task_queue, resume=False):
+        """
+        Submits the files put on feed_queue to the scheduler until it receives None. With `resume`, files the
+        manifest records as already converted with the same options are skipped. Files that never start
+        because the batch was cancelled are reported as such.
+        """
+        while True:
+            job = feed_queue.get()
+            if job is None:
+                return
+            item_id, file_path = job
+            if scheduler.cancelled:
+                task_queue.put((item_id, "cancelled"))
+                continue
+
+            manifest.add([file_path])
+            if resume and manifest.is_finished(file_path, options):
+                log(f"Skipping {file_path}, it was already converted")
+                task_queue.put((item_id, "skipped"))
+                continue
+
+            log(f"Queueing file: {file_path}")
+            manifest.start(file_path)
+            callback = lambda future, item_id=item_id, file_path=file_path: self.on_job_done(future, file_path, manifest, options, task_queue, item_id)
+            if scheduler.submit_image(file_path, output_dir, options, callback=callback) is None:
+                task_queue.put((item_id, "cancelled"))
+
+    def on_job_done(self, future, file_path, manifest, options, task_queue, item_id):
+        """Records a finished job in the manifest and reports its status back to the UI thread through the processing queue."""
+        if future.cancelled():
+            task_queue.put((item_id, "cancelled"))
+            return
+
+        e = future.exception()
+        if e is None:
+            result = future.result()
+            self.record_job(manifest.finish, file_path, result, options)
+            screen = result.get('screen')
+            if screen is not None:
+                details = f"ink {screen['ink']:.4%}" if screen['reason'] == 'blank' else f"of {screen['of']}, distance {screen['distance']}"
+                log(f"Screening flagged {file_path} as a {screen['reason']} page ({details}), policy: {screen['policy']}")
+            log(f"Processed {file_path} in {result['seconds']:.2f}s ({format_timings(result.get('timings'))})")
+            task_queue.put((item_id, "skipped" if screen is not None and screen['policy'] == 'drop' else "done"))
+        else:
+            self.record_job(manifest.fail, file_path, f"{type(e).__name__}: {e}")
+            log(f"Error processing file {file_path}: {e}", error=True, exc=e)
+            task_queue.put((item_id, "error"))
 
-    def process_image_thread(self, file_path, output_dir, task_queue, item_id): # Added item_id
-        """Worker function to process a single image in a separate thread."""
+    def record_job(self, update, file_path, *args):
+        """
+        Calls a JobManifest update for a file, logging instead of raising if it fails: the job's status must
+        still reach the UI thread, or the batch would never be seen to finish.
+        """
         try:
-            draw_bounds_before_process(file_path, output_dir)
-            img_to_pdf(file_path, output_dir)
-            task_queue.put(item_id) # Put item_id in queue on success
+            update(file_path, *args)
         except Exception as e:
-            log(f"Error processing file {file_path}: {e}", error=True)
-            task_queue.put(None) # Put None in queue on error
+            log(f"Could not record {file_path} in the job manifest: {e}", error=True, exc=e)
 
+    def cancel_processing(self):
+        """Cancels the files that have not started yet; files already being processed are finished."""
+        if self.scheduler is not None:
+            log("Cancelling PDF conversion batch...")
+            self.scheduler.cancel()
+            self.cancel_button.config(state=tk.DISABLED)
 
     def check_processing_queue(self):
-        """Checks the processing queue for completed tasks and updates progress."""
+        """
+        Applies up to MAX_EVENTS_PER_TICK finished jobs from the processing queue to the lists and the progress bar.
+        However many files finished since the last tick, the lists are redrawn and the progress updated only once.
+        """
+        handled = 0
+        converted = []
+        errors = 0
         try:
-            while True:
-                item_id_processed = self.processing_queue.get_nowait() # Get item_id (or None for error)
-                if item_id_processed is not None: # Successful processing
+            while handled < MAX_EVENTS_PER_TICK:
+                item_id_processed, status = self.processing_queue.get_nowait()
+                handled += 1
+                self.files_completed += 1
+                if status in ("done", "skipped"): # Successful processing, now or by an earlier run of the batch
                     self.files_processed += 1
-                    progress_percent = (self.files_processed / self.progress_bar["maximum"]) * 100
-                    self.update_progress(progress_percent)
-                    log(f"File processed. Progress: {progress_percent:.2f}%")
-
-                    # Move item from input to output list
-                    item_values = self.input_list.item(item_id_processed)["values"]
-                    file_name = item_values[1] # File name is in the 2nd column
-                    file_size = item_values[2] # File size is in the 3rd column
-                    self.output_list.insert("", "end", values=(file_name, file_size)) # Insert into output list
-                    self.input_list.delete(item_id_processed) # Delete from input list
-
-                else:
-                    log("File processing reported an error (check logs)") # Handle error signal if needed
-
+                    converted.append(item_id_processed)
+                elif status == "error":
+                    errors += 1 # Failed files stay in the input list
                 self.processing_queue.task_done()
-
         except queue.Empty:
             pass
 
-        if self.files_processed < self.progress_bar["maximum"]:
-            self.root.after(100, self.check_processing_queue)
+        if handled:
+            # Move converted items from the input to the output list (file name and size columns)
+            rows = []
+            for item_id in converted:
+                item_values = self.input_list.get(item_id)
+                if item_values is not None: # Unless it was deleted from the list meanwhile
+                    rows.append((item_id, (item_values[1], item_values[2])))
+            self.output_list.insert_many(rows)
+            self.input_list.delete_many(converted)
+
+            self.update_progress(self.files_completed)
+            progress_percent = self.files_completed / max(1, self.files_total) * 100
+            if converted:
+                log(f"{len(converted)} file(s) processed. Progress: {progress_percent:.2f}%")
+            if errors:
+                log(f"{errors} file(s) reported an error (check logs)")
+
+        if self.files_completed < self.files_total:
+            # Come back sooner while a backlog of finished jobs is waiting
+            self.root.after(10 if handled == MAX_EVENTS_PER_TICK else 100, self.check_processing_queue)
         else:
-            log("PDF conversion batch finished.")
-            messagebox.showinfo("Conversion Complete", "All images converted to PDF!") # Show message box
+            cancelled = self.scheduler.cancelled
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+            self.feed_queue.put(None) # Stops the feeder thread
+            self.feed_queue = None
+            self.manifest.close()
+            self.manifest = None
+            log(f"PDF conversion batch {'cancelled' if cancelled else 'finished'}. {self.files_processed} of {self.files_completed} file(s) converted.")
+            if cancelled:
+                messagebox.showinfo("Conversion Cancelled", f"{self.files_processed} image(s) converted before cancelling.")
+            elif self.files_processed < self.files_completed:
+                messagebox.showwarning("Conversion Complete", f"{self.files_completed - self.files_processed} image(s) failed, see the log for details.")
+            else:
+                messagebox.showinfo("Conversion Complete", "All images converted to PDF!") # Show message box
             self.arrow_button.config(state=tk.NORMAL) # Re-enable process button
+            self.cancel_button.config(state=tk.DISABLED)
             self.root.config(cursor="") # Revert cursor to default
-            if not self.input_list.get_children(): # Hide progress bar if input list is now empty
+            if not len(self.input_list): # Hide progress bar if input list is now empty
                 self.hide_progress()
 
 
-session_date = time.strftime("%Y-%m-%d_%H-%M-%S")
-
-def log(message, error=False):
-    log_file = assert_log_file()
-    t = time.strftime("%Y-%m-%d %H:%M:%S")
-
-    if not (error):
-        print(f"[ {t} ] {message}")
-        with log_file.open("a") as f:
-            f.write(f"[ {t} ] {message}\n")
-    else:
-        print(f"[ {t} ] {message}")
-        with log_file.open("a") as f:
-             f.write(f"[ {t} ] {message}\n")
-        traceback.print_exc()
-        with log_file.open("a") as f:
-            traceback.print_exc(file=f)
-
-def assert_log_file():
-    global session_date
-
-    log_dir = pathlib.Path("./logs")
+def format_timings(timings):
+    """Formats a summarize_timings() dict for the log, e.g. 'decode 0.12s, readtext 3.40s, ... 57 boxes, 2480x3508'."""
+    if not timings:
+        return "no timings"
+    parts = [f"{name} {seconds:.2f}s" for name, seconds in timings["stages"].items()]
+    if "boxes" in timings:
+        parts.append(f"{timings['boxes']} boxes")
+    if "width" in timings:
+        parts.append(f"{timings['width']}x{timings['height']}")
+    return ", ".join(parts)
 
-    if not log_dir.exists():
-        log_dir.mkdir()
-
-    log_file = pathlib.Path(log_dir, f"log_{session_date}.txt")
-
-    if not log_file.exists():
-        log_file.touch()
-
-    return log_file
+session_date = time.strftime("%Y-%m-%d_%H-%M-%S")
 
-def main():
-    log_file = assert_log_file()
+class LogWriter:
+    """
+    Writes log records from any thread without blocking it: callers only put a record on a queue, and a
+    background thread keeps the log file open and writes whatever has queued up in one batch, flushing once
+    per batch. Records are echoed to the console from that thread too.
+
+    The file is rotated to log_<session>.1.txt, .2.txt, ... once it grows past `max_bytes`.
+    With `json_lines`, each record is written as one JSON object per line (log_<session>.jsonl) instead of text.
+    """
+    def __init__(self, log_dir="./logs", session=session_date, json_lines=False, max_bytes=10 * 1024 * 1024, backups=5, echo=True):
+        self.log_dir = pathlib.Path(log_dir)
+        self.json_lines = json_lines
+        self.path = self.log_dir / f"log_{session}{'.jsonl' if json_lines else '.txt'}"
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.echo = echo
+        self._records = queue.SimpleQueue() # Unbounded, put() never blocks
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        self._records.put(record)
+
+    def close(self, timeout=5):
+        """Writes out everything queued so far and stops the writer thread."""
+        self._records.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a", encoding="utf-8")
+        stopping = False
+        while not stopping:
+            batch = [self._records.get()] # Wait for the first record, then take everything else that is queued
+            try:
+                while len(batch) < 1000:
+                    batch.append(self._records.get_nowait())
+            except queue.Empty:
+                pass
+            if None in batch:
+                stopping = True
+                batch = [record for record in batch if record is not None]
+
+            lines = [self._format(record) for record in batch]
+            if lines:
+                self._file.write("".join(lines))
+                self._file.flush()
+                if self.echo:
+                    sys.stdout.write("".join(self._format_text(record) for record in batch))
+                    sys.stdout.flush()
+                if self._file.tell() > self.max_bytes:
+                    self._rotate()
+        self._file.close()
+
+    def _format(self, record):
+        if self.json_lines:
+            return json.dumps(record, ensure_ascii=False) + "\n"
+        return self._format_text(record)
+
+    @staticmethod
+    def _format_text(record):
+        text = f"[ {record['time']} ] {record['message']}\n"
+        if record.get("traceback"):
+            text += record["traceback"]
+        return text
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            older = self.path.with_suffix(f".{index}{self.path.suffix}")
+            if older.exists():
+                older.replace(self.path.with_suffix(f".{index + 1}{self.path.suffix}"))
+        if self.backups > 0:
+            self.path.replace(self.path.with_suffix(f".1{self.path.suffix}"))
+        else:
+            self.path.unlink()
+        self._file = self.path.open("a", encoding="utf-8")
+
+_log_writer = None
+_log_writer_lock = threading.Lock()
+
+def start_logging(**kwargs):
+    """Starts the background log writer (see LogWriter for the arguments). Records logged before this use the defaults."""
+    global _log_writer
+    with _log_writer_lock:
+        if _log_writer is None:
+            _log_writer = LogWriter(**kwargs)
+            atexit.register(_log_writer.close) # The writer thread is a daemon, flush what is left on exit
+    return _log_writer
+
+def log(message, error=False, exc=None):
+    """
+    Logs a message without blocking the caller. With error=True the traceback of `exc`, or of the exception
+    currently being handled, is logged with it.
+    """
+    record = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "level": "error" if error else "info",
+              "thread": threading.current_thread().name, "message": str(message)}
+    if error:
+        if exc is not None:
+            record["traceback"] = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+        elif sys.exc_info()[0] is not None:
+            record["traceback"] = traceback.format_exc()
+    (_log_writer or start_logging()).write(record)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="img2pdf_gui", description="Graphical interface for converting images to searchable PDFs.")
+    parser.add_argument("--no-warmup", action="store_true", help="Do not load the OCR models in the background at startup")
+    parser.add_argument("--json-log", action="store_true", help="Write the log as JSON lines instead of text")
+    args = parser.parse_args(argv)
+
+    start_logging(json_lines=args.json_log)
 
     root = tk.Tk()
     gui = Img2PdfGUI(root)
+    root.after(200, gui.offer_resume) # Pick up a batch that was interrupted by a crash
+
+    if not args.no_warmup:
+        # Load the OCR models in the background once the window is up, instead of on the first processed file
+        root.after(500, lambda: warm_up_readers(background=True))
+
     root.mainloop()
 
 if __name__ == "__main__":